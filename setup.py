@@ -2,5 +2,6 @@ from setuptools import setup
 
 setup(
     name='xcdiff',
+    version='0.1.0',
     packages=['xcdiff'],
 )
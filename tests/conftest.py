@@ -0,0 +1,75 @@
+import re
+import shutil
+import subprocess
+
+import sympy
+
+import pytest
+
+from xcdiff import cbench
+
+FOURTH_MAIN = """
+int main(void)
+{{
+    FunDensProp dp = {{{point}}};
+    FunFourthFuncDrv a = {{0}}, b = {{0}};
+    real *pa = (real*)&a, *pb = (real*)&b;
+    {name}_fourth(&a, 1.0, &dp);
+    other_fourth(&b, 1.0, &dp);
+    for (unsigned i = 0; i < sizeof(a)/sizeof(real); i++)
+        printf("%.17g %.17g\\n", pa[i], pb[i]);
+    return 0;
+}}
+"""
+
+
+@pytest.fixture
+def symbols():
+    return sympy.symbols("dp->rhoa, dp->rhob, dp->grada, dp->gradb, dp->gradab")
+
+
+@pytest.fixture
+def run_c(tmp_path):
+    """
+    Compile and run a main function with the given fun-{name}.c sources
+    included, against the stand-in headers of cbench, returning its output
+    """
+    if shutil.which('cc') is None:
+        pytest.skip('no C compiler')
+
+    def run(sources: dict, main: str) -> str:
+        (tmp_path / 'general.h').write_text(cbench.GENERAL_H)
+        (tmp_path / 'functionals.h').write_text(cbench.functionals_h())
+        for name, code in sources.items():
+            (tmp_path / f'fun-{name}.c').write_text(code)
+        includes = ''.join(f'#include "fun-{name}.c"\n' for name in sources)
+        (tmp_path / 'main.c').write_text(includes + main)
+        subprocess.run(
+            ['cc', '-std=gnu99', '-w', '-I', str(tmp_path), '-o', str(tmp_path / 'main'),
+             str(tmp_path / 'main.c'), '-lm'],
+            check=True
+        )
+        return subprocess.run(
+            [str(tmp_path / 'main')], check=True, capture_output=True, text=True
+        ).stdout
+
+    return run
+
+
+@pytest.fixture
+def fourth_derivatives(run_c):
+    """
+    Pairs of the fourth() components of two functionals at a density
+    point; the second is compiled renamed to other, without the constants
+    of the first
+    """
+    def evaluate(functional, other, point=(0.3, 0.7, 0.2, 0.05, 0.01)) -> list:
+        prefix = rf'\b{other.name}(?=_|Functional\b|")'
+        code = re.sub(prefix, 'other', str(other), flags=re.I)
+        if functional.const:
+            code = code.replace(functional.const, '')
+        main = FOURTH_MAIN.format(name=functional.name, point=', '.join(map(str, point)))
+        output = run_c({functional.name: str(functional), 'other': code}, main)
+        return [tuple(map(float, line.split())) for line in output.splitlines()]
+
+    return evaluate
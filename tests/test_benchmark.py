@@ -0,0 +1,37 @@
+import json
+
+from xcdiff import benchmark
+
+
+def test_run():
+    results = benchmark.run(['slater'], ('energy', 'gradient'))
+    assert set(results['results']['slater']) == {'energy', 'gradient'}
+    assert results['results']['slater']['gradient']['time'] > 0
+    assert results['results']['slater']['gradient']['peak'] > 0
+    assert 'sympy' in results['meta']
+
+
+def test_compare():
+    baseline = {'results': {'slater': {'energy': {'time': 1.0}, 'gradient': {'time': 1.0}}}}
+    current = {
+        'results': {
+            'slater': {'energy': {'time': 1.05}, 'gradient': {'time': 1.5}},
+            'lyp': {'energy': {'time': 1.0}},
+        }
+    }
+    rows = benchmark.compare(baseline, current, tolerance=0.1)
+    assert [(name, order, regressed) for name, order, *_, regressed in rows] == [
+        ('slater', 'energy', False),
+        ('slater', 'gradient', True),
+    ]
+
+
+def test_main(tmp_path, capsys):
+    output = tmp_path / 'baseline.json'
+    argv = ['--only', 'example2', '--orders', 'energy', '--output', str(output)]
+    assert benchmark.main(argv) == 0
+    assert 'example2' in json.loads(output.read_text())['results']
+    argv = ['--only', 'example2', '--orders', 'energy', '--compare', str(output),
+            '--tolerance', '1000']
+    assert benchmark.main(argv) == 0
+    assert 'ratio' in capsys.readouterr().out
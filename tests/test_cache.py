@@ -0,0 +1,80 @@
+import sympy
+
+import pytest
+
+from xcdiff import GGAFunctional
+from xcdiff.benchmark import pbex
+from xcdiff.cache import DiskCache
+from xcdiff.derivatives import DerivativeTable
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return DiskCache(tmp_path / 'cache')
+
+
+def test_roundtrip(cache):
+    cache.save('abcd', ccode='x')
+    cache.save('abcd', expr="Symbol('x')")
+    assert cache.load('abcd') == {'ccode': 'x', 'expr': "Symbol('x')"}
+
+
+def test_missing(cache):
+    assert cache.load('abcd') == {}
+
+
+def test_digest_depends_on_variables(cache):
+    x, y = sympy.symbols('x, y')
+    hasher = cache.hasher(x*y)
+    assert cache.digest(hasher, (x,)) != cache.digest(hasher, (y,))
+    assert cache.digest(hasher, (x,)) == cache.digest(cache.hasher(x*y), (x,))
+
+
+def test_evict(tmp_path):
+    cache = DiskCache(tmp_path, max_size=100)
+    cache.save('aa', ccode='x'*60)
+    cache.save('bb', ccode='y'*60)
+    assert cache.load('aa') == {}
+    assert cache.load('bb') == {'ccode': 'y'*60}
+    assert cache.size <= 100
+
+
+def test_table_reuses_cache(cache):
+    x, y = sympy.symbols('x, y')
+    DerivativeTable(x**3*y, cache).code((x, x, y))
+    table = DerivativeTable(x**3*y, cache)
+    assert table.code((x, y, x)) == '6*x'
+    assert len(table) == 1
+
+
+@pytest.fixture
+def gga2(tmp_path):
+    ra, rb, ga, gb = sympy.symbols("dp->rhoa, dp->rhob, dp->grada, dp->gradb")
+    return lambda: GGAFunctional(
+        "Example2", ra, rb, ga, gb, ra * ga * ga, rb * gb * gb,
+        cache_dir=tmp_path / 'cache'
+    )
+
+
+def test_second_run(gga2):
+    first = gga2()
+    second = gga2()
+    assert str(first) == str(second)
+    assert len(second.dFa) == 1
+
+
+def test_digest_depends_on_sympy_version(cache, monkeypatch):
+    x = sympy.Symbol('x')
+    digest = cache.digest(cache.hasher(x), (x,))
+    monkeypatch.setattr(sympy, '__version__', '0.0')
+    assert cache.digest(cache.hasher(x), (x,)) != digest
+
+
+@pytest.mark.parametrize('options', [
+    {'cse': True}, {'hoist_powers': True}, {'shared': True},
+])
+def test_warm_cache_output(tmp_path, options):
+    cold = str(pbex(**options))
+    str(pbex(cache_dir=tmp_path))
+    warm = pbex(cache_dir=tmp_path, **options)
+    assert str(warm) == cold
@@ -0,0 +1,119 @@
+import json
+
+import sympy
+
+import pytest
+
+from xcdiff import GeneralFunctional, base, catalog
+
+SLATER = {
+    "name": "Slater",
+    "class": "Functional",
+    "definitions": {"PREF": "-3/4*(6/pi)**(1/3)"},
+    "Fa": "PREF*rhoa**(4/3)",
+    "Fb": "PREF*rhob**(4/3)",
+    "threshold": 1e-20,
+}
+
+GENERAL = {
+    "name": "G",
+    "class": "GeneralFunctional",
+    "F": "rhoa*rhob*gradab",
+    "const": "static const real C = 1;",
+    "options": {"cse": True},
+}
+
+
+@pytest.fixture
+def path(tmp_path):
+    path = tmp_path / 'catalog.json'
+    path.write_text(json.dumps([SLATER, GENERAL]))
+    return path
+
+
+def test_load(path):
+    assert [entry['name'] for entry in catalog.load(path)] == ['Slater', 'G']
+
+
+@pytest.mark.parametrize('entries, message', [
+    ([{"class": "Functional"}], 'without a name'),
+    ([SLATER, dict(SLATER, name='slater')], 'duplicate'),
+    ([dict(SLATER, **{'class': 'LDA'})], 'unknown class LDA'),
+    ([{"name": "G", "class": "GeneralFunctional"}], 'lacks F'),
+])
+def test_load_invalid(tmp_path, entries, message):
+    path = tmp_path / 'catalog.json'
+    path.write_text(json.dumps(entries))
+    with pytest.raises(ValueError, match=message):
+        catalog.load(path)
+
+
+def test_build():
+    ra, rb, ga, gb, gab = sympy.symbols("dp->rhoa, dp->rhob, dp->grada, dp->gradb, dp->gradab")
+    functional = catalog.build(GENERAL)
+    expected = GeneralFunctional(
+        "G", ra, rb, ga, gb, gab, ra * rb * gab, const="static const real C = 1;", cse=True
+    )
+    assert str(functional) == str(expected)
+    slater = catalog.build(SLATER)
+    third = sympy.Rational(1, 3)
+    assert slater.Fa == -sympy.Rational(3, 4) * (6 / sympy.pi)**third * ra**(4 * third)
+    assert slater.threshold == 1e-20
+
+
+@pytest.mark.parametrize('jobs', [1, 2])
+def test_run(tmp_path, jobs):
+    bad = {"name": "Bad", "class": "GGAFunctional", "Fa": "rhoa**(", "Fb": "rhob"}
+    calls = []
+    results = catalog.run(
+        [SLATER, bad, GENERAL], tmp_path, jobs, lambda *args: calls.append(args)
+    )
+    assert [r['name'] for r in results] == ['Slater', 'Bad', 'G']
+    assert (tmp_path / 'fun-slater.c').read_text() == str(catalog.build(SLATER))
+    assert 'SympifyError' in results[1]['error']
+    assert sorted(done for done, _, _ in calls) == [1, 2, 3]
+    assert '2 generated, 0 unchanged, 1 failed' in catalog.report(results)
+
+
+def test_main(path, tmp_path, capsys):
+    assert catalog.main([str(path), '--output-dir', str(tmp_path / 'out'), '--jobs', '1',
+                         '--only', 'g']) == 0
+    assert sorted(p.name for p in (tmp_path / 'out').iterdir()) == ['fun-g.c', 'manifest.json']
+    out, err = capsys.readouterr()
+    assert '1 generated, 0 unchanged, 0 failed' in out
+    assert '[1/1] G' in err
+
+
+def test_manifest(tmp_path):
+    results = catalog.run([SLATER, GENERAL], tmp_path, jobs=1)
+    manifest = json.loads((tmp_path / 'manifest.json').read_text())
+    assert manifest == {'fun-g.c': results[1]['digest'], 'fun-slater.c': results[0]['digest']}
+    slater = tmp_path / 'fun-slater.c'
+    mtime = slater.stat().st_mtime_ns
+
+    changed = dict(GENERAL, threshold=1e-12)
+    results = catalog.run([SLATER, changed], tmp_path, jobs=1)
+    assert [r.get('skipped', False) for r in results] == [True, False]
+    assert slater.stat().st_mtime_ns == mtime
+    assert 'G_THRESHOLD = 1e-12' in (tmp_path / 'fun-g.c').read_text()
+
+    results = catalog.run([SLATER], tmp_path, jobs=1, force=True)
+    assert not results[0].get('skipped')
+    assert slater.stat().st_mtime_ns == mtime
+    assert 'fun-g.c' in json.loads((tmp_path / 'manifest.json').read_text())
+
+
+def test_manifest_versions(monkeypatch):
+    digest = catalog.build(SLATER).digest()
+    assert catalog.build(dict(SLATER, info='Slater exchange')).digest() != digest
+    assert catalog.build(dict(SLATER, options={'processes': 2})).digest() == digest
+    monkeypatch.setattr(base, 'TEMPLATE_VERSION', base.TEMPLATE_VERSION + 1)
+    assert catalog.build(SLATER).digest() != digest
+
+
+def test_manifest_missing_file(tmp_path):
+    catalog.run([SLATER], tmp_path, jobs=1)
+    (tmp_path / 'fun-slater.c').unlink()
+    results = catalog.run([SLATER], tmp_path, jobs=1)
+    assert not results[0].get('skipped')
+    assert (tmp_path / 'fun-slater.c').exists()
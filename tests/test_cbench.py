@@ -0,0 +1,46 @@
+import shutil
+import subprocess
+
+import sympy
+
+import pytest
+
+from xcdiff import GeneralFunctional
+from xcdiff import cbench
+
+
+def test_label():
+    ra, rb, ga, gb, gab = cbench.VARIABLES
+    assert cbench.label((ra, ga)) == 'df1010'
+    assert cbench.label((ra, gab, gab)) == 'df10002'
+
+
+def test_functionals_h():
+    header = cbench.functionals_h()
+    assert header.count('real df1000;') == 4
+    assert header.count('real df00004;') == 1
+    assert '} FunFourthFuncDrv;' in header
+
+
+@pytest.mark.skipif(shutil.which('cc') is None, reason='no C compiler')
+def test_run():
+    ra, rb, ga, gb, gab = sympy.symbols("dp->rhoa, dp->rhob, dp->grada, dp->gradb, dp->gradab")
+    functional = GeneralFunctional(
+        "Example2x", ra, rb, ga, gb, gab, ra*rb*(ga*ga + gb*gb + 2*gab)
+    )
+    results = cbench.run(functional, points=1000, repeat=1, orders=('energy', 'second'))
+    assert set(results) == {'energy', 'second'}
+    assert all(ns > 0 for ns in results.values())
+    assert 'Example2x' in cbench.report({'Example2x': results})
+
+
+@pytest.mark.skipif(shutil.which('cc') is None, reason='no C compiler')
+def test_run_max_order():
+    ra, rb, ga, gb, gab = sympy.symbols("dp->rhoa, dp->rhob, dp->grada, dp->gradb, dp->gradab")
+    functional = GeneralFunctional(
+        "Example2x", ra, rb, ga, gb, gab, ra*rb*(ga*ga + gb*gb + 2*gab), max_order=1
+    )
+    results = cbench.run(functional, points=1000, repeat=1, orders=('energy', 'first'))
+    assert set(results) == {'energy', 'first'}
+    with pytest.raises(subprocess.CalledProcessError):
+        cbench.run(functional, points=10, repeat=1, orders=('second',))
@@ -0,0 +1,123 @@
+import re
+
+import sympy
+
+import pytest
+
+from xcdiff import CombinedFunctional, ExampleFunctional, Functional, GeneralFunctional
+from xcdiff.benchmark import b88, slater
+
+
+@pytest.fixture
+def lda(symbols):
+    ra, rb, *_ = symbols
+    third = sympy.Rational(1, 3)
+    return Functional("LDA", ra, rb, -ra**(4 * third), -rb**(4 * third), threshold=1e-20)
+
+
+def test_sum(symbols, lda):
+    ra, rb, ga, gb, _ = symbols
+    gga = b88()
+    combined = CombinedFunctional("Mix", [(sympy.Rational(4, 5), lda), ('1/5', gga)])
+    assert combined.F == sympy.Rational(4, 5) * (lda.Fa + lda.Fb) + (gga.Fa + gga.Fb) / 5
+    assert combined.variables == (ra, rb, ga, gb, symbols[4])
+    assert combined.cse
+    assert combined.separable
+    assert "    4/5*LDA + 1/5*B88\n" in combined.header()
+    for key in [(ra,), (ra, ga), (ga, ga, ra)]:
+        expected = sympy.Rational(4, 5) * lda.dFa[key] + gga.dFa[key] / 5
+        assert sympy.simplify(combined.dFa[key] + combined.dFla[key] - expected) == 0
+
+
+def test_threshold_guards():
+    combined = CombinedFunctional("Mix", [(0.8, slater()), (0.2, b88())], threshold=1e-20)
+    assert combined.guarded
+    hessian = combined.hessian()
+    unguarded, alpha, beta = hessian.split('if (')
+    # the second derivative of Slater in rhob, rhob**(-2/3)
+    slater_term = r'pow\(dp->rhob, -(2\.0/3\.0|0\.666)'
+    assert not re.search(slater_term, unguarded)
+    assert alpha.startswith('dp->rhoa>MIX_THRESHOLD)')
+    assert beta.startswith('dp->rhob>MIX_THRESHOLD)')
+    assert re.search(slater_term, beta)
+    assert 'if (dp->rhob >MIX_THRESHOLD)' in combined.energy()
+
+
+def test_default_threshold(symbols, lda):
+    ra, rb, *_ = symbols
+    other = Functional("X", ra, rb, ra**2, rb**2, threshold=1e-12)
+    combined = CombinedFunctional("Mix", [(1, lda), (1, other)])
+    assert combined.threshold == 1e-12
+    assert 'static const real MIX_THRESHOLD = 1e-12;' in str(combined)
+    assert not CombinedFunctional("Mix", [(1, b88())]).guarded
+
+
+def test_lda_only(lda):
+    combined = CombinedFunctional("Mix", [(1, lda), (1, slater())])
+    assert combined.gga == 0
+    assert 'return 0;' in combined.interface()
+    assert combined.Frest == 0
+    assert [guard for guard, _ in combined.layout(2)] == [
+        'dp->rhoa>MIX_THRESHOLD', 'dp->rhob>MIX_THRESHOLD'
+    ]
+    assert '(0)*factor' not in str(combined)
+    assert 'taylor_compose' in str(CombinedFunctional("Mix", [(1, lda)], taylor=True))
+    nested = CombinedFunctional("Nested", [(2, combined), (1, b88())])
+    assert nested.guarded
+    assert nested.gga == 1
+    assert nested.Fla == 2 * (lda.Fa + slater().Fa)
+
+
+def test_zero_density(symbols, run_c):
+    general = GeneralFunctional("G", *symbols, symbols[0] * symbols[1] * symbols[4])
+    combined = CombinedFunctional("Mix", [(1, slater()), (1, general)])
+    output = run_c({'mix': str(combined)}, """
+int main(void)
+{
+    FunDensProp dp = {0.3, 0.0, 0.2, 0.0, 0.0};
+    FunThirdFuncDrv ds = {0};
+    real *p = (real*)&ds;
+    int finite = isfinite(mix_energy(&dp));
+    mix_third(&ds, 1.0, &dp);
+    for (unsigned i = 0; i < sizeof(ds)/sizeof(real); i++)
+        finite = finite && isfinite(p[i]);
+    printf("%d\\n", finite);
+    return 0;
+}
+""")
+    assert output == '1\n'
+
+
+def test_general_term(symbols, lda):
+    ra, rb, ga, gb, gab = symbols
+    general = GeneralFunctional("G", ra, rb, ga, gb, gab, ra * rb * gab)
+    combined = CombinedFunctional("Mix", [(2, lda), (3, general)], cse=False)
+    assert combined.F == 2 * (lda.Fa + lda.Fb) + 3 * ra * rb * gab
+    assert not combined.separable
+    assert not combined.cse
+    assert "  ds->df1100 += (3*dp->gradab)*factor;" in combined.hessian()
+
+
+def test_shared_subexpressions(lda):
+    combined = CombinedFunctional("Mix", [(1, lda), (1, b88())])
+    gradient = combined.gradient()
+    # rhoa**(4/3) of both terms is computed once
+    assert gradient.count('pow(dp->rhoa, 4.0/3.0)') == 1
+
+
+def test_const():
+    terms = [(1, slater(const='#define C 1')), (1, b88(const='#define C 1'))]
+    combined = CombinedFunctional("Mix", terms)
+    assert combined.const == '#define C 1'
+
+
+def test_invalid(symbols, lda):
+    ra, rb, ga, gb, _ = symbols
+    with pytest.raises(ValueError, match='no terms'):
+        CombinedFunctional("Mix", [])
+    example = ExampleFunctional("E", ra, rb, ga, gb, ra * ga, rb * gb)
+    with pytest.raises(TypeError, match='cannot combine E'):
+        CombinedFunctional("Mix", [(1, example)])
+    other = Functional("X", sympy.Symbol('x'), rb, sympy.Symbol('x'), rb)
+    with pytest.raises(ValueError, match='terms differ in ra'):
+        CombinedFunctional("Mix", [(1, lda), (1, other)])
@@ -0,0 +1,131 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import sympy
+
+import pytest
+
+from xcdiff.derivatives import DerivativeTable
+
+
+@pytest.fixture
+def table():
+    x, y = sympy.symbols("x, y")
+    return DerivativeTable(x**3 * sympy.exp(y))
+
+
+def test_zeroth_order(table):
+    assert table[()] is table.expr
+
+
+def test_derivative(table):
+    x, y = sympy.symbols("x, y")
+    assert table[x, x, y] == 6*x*sympy.exp(y)
+
+
+def test_multiset_key(table):
+    x, y = sympy.symbols("x, y")
+    assert table[x, y, x] is table[y, x, x]
+
+
+def test_memoized(table):
+    x, y = sympy.symbols("x, y")
+    table[x, y]
+    assert (y, x) in table
+    assert len(table) == 3
+
+
+def test_parent_stored(table):
+    x, y = sympy.symbols("x, y")
+    table[x, x, y, y]
+    assert (x, x) in table
+    assert (x, y) not in table
+
+
+def test_fill(table):
+    x, y = sympy.symbols("x, y")
+    table.fill((x, y), 2)
+    assert len(table) == 6
+    assert table[x, y] == 3*x**2*sympy.exp(y)
+
+
+def test_compute(table):
+    x, y = sympy.symbols("x, y")
+    table.compute([(x, y, y), (y, x)])
+    assert (x, y, y) in table
+    assert (x,) in table
+    assert table[x, y, y] == 3*x**2*sympy.exp(y)
+
+
+def test_compute_parallel_identical():
+    x, y = sympy.symbols("x, y")
+    beta = sympy.Rational(42, 10000)
+    s = y / x**sympy.Rational(4, 3)
+    F = -x**sympy.Rational(4, 3) * (1 + beta * s**2 / (1 + 6 * beta * s * sympy.asinh(s)))
+    keys = [(x, x, x), (x, x, y)]
+    serial, parallel = DerivativeTable(F), DerivativeTable(F)
+    serial.compute(keys)
+    with ProcessPoolExecutor(2) as executor:
+        parallel.compute(keys, executor)
+    for key in keys:
+        assert sympy.ccode(parallel[key]) == sympy.ccode(serial[key])
+
+
+def test_vanishes_by_dependency():
+    x, y, z = sympy.symbols("x, y, z")
+    table = DerivativeTable(x**2 + y**3)
+    assert table.vanishes((z,))
+    assert table.vanishes((x, z, z))
+    assert not table.vanishes((x, y))
+    table[x]
+    assert table.vanishes((x, y))
+
+
+def test_pruned_before_diff(monkeypatch):
+    x, y = sympy.symbols("x, y")
+    calls = []
+
+    def differentiate(expr, variable, count):
+        calls.append((variable, count))
+        return expr.diff(variable, count)
+
+    monkeypatch.setattr('xcdiff.derivatives.differentiate', differentiate)
+    table = DerivativeTable(x**2 + y**3)
+    table.compute([(x,), (y, y)])
+    assert calls == [(x, 1), (y, 2)]
+    assert table[x, x, y, y] == 0
+    table.compute([(x, y), (x, y, y, y)])
+    assert calls == [(x, 1), (y, 2)]
+
+
+def test_substituted_from_source(monkeypatch):
+    x, y, u, v = sympy.symbols("x, y, u, v")
+    swap = {x: u, u: x, y: v, v: y}
+    source = DerivativeTable(x**2*y)
+    table = DerivativeTable(u**2*v, source=source, swap=swap)
+    source[x, x]
+    monkeypatch.setattr('xcdiff.derivatives.differentiate', None)
+    assert table[u, u] == 2*v
+
+
+def test_symmetric_half(monkeypatch):
+    x, u = sympy.symbols("x, u")
+    table = DerivativeTable(x**3*u + x*u**3, swap={x: u, u: x})
+    assert table.image(table.key((u, u))) is None
+    assert table.image(table.key((x, x))) == (u, u)
+    assert table.image(table.key((x, u))) is None
+    table[u, u]
+    monkeypatch.setattr('xcdiff.derivatives.differentiate', None)
+    assert table[x, x] == 6*x*u
+
+
+def test_compute_parallel_symmetric():
+    x, u = sympy.symbols("x, u")
+    F = sympy.exp(-x * u) * (x**3 + u**3)
+    keys = [(x, x, u), (x, u, u), (u, u, u)]
+    serial = DerivativeTable(F, swap={x: u, u: x})
+    parallel = DerivativeTable(F, swap={x: u, u: x})
+    serial.compute(keys)
+    with ProcessPoolExecutor(2) as executor:
+        parallel.compute(keys, executor)
+    for key in keys:
+        assert sympy.ccode(parallel[key]) == sympy.ccode(serial[key])
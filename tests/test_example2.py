@@ -207,3 +207,22 @@ example2_fourth(FunFourthFuncDrv *ds, real factor, const FunDensProp* dp)
 """
 
     assert example2.fourth() == reference
+
+
+def test_example2_hessian_batch(example2):
+    reference = """
+/* out[k*n + i]: 0 df1000, 1 df0010, 2 df1010, 3 df0020 */
+void
+example2_second_batch(integer n, real factor, const real* restrict rhoa, const real* restrict rhob, const real* restrict grada, const real* restrict gradb, real* restrict out)
+{
+  integer i;
+  for (i = 0; i < n; i++) {
+     out[0*n + i] += EPREF*(pow(grada[i], 2))*factor;
+     out[1*n + i] += EPREF*(2*grada[i]*rhoa[i])*factor;
+     out[2*n + i] += EPREF*(2*grada[i])*factor;
+     out[3*n + i] += EPREF*(2*rhoa[i])*factor;
+  }
+}
+"""
+
+    assert example2.batch_code(2) == reference
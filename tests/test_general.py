@@ -1,7 +1,10 @@
+import io
+
 import pytest
 import sympy
 
-from xcdiff.general import comment_zero_lines, GeneralFunctional
+from xcdiff import GGAFunctional
+from xcdiff.general import comment_zero_lines, separate, GeneralFunctional
 
 
 @pytest.mark.parametrize(
@@ -327,3 +330,144 @@ example2x_fourth(FunFourthFuncDrv *ds, real factor, const FunDensProp* dp)
 }}
 """
     assert gga2x.fourth() == reference
+
+
+def test_gga2x_cse_gradient(gga2x):
+    gga2x.cse = True
+    reference = f"""
+static void
+example2x_first(FunFirstFuncDrv *ds, real factor, const FunDensProp* dp)
+{{
+  const real t0 = pow(dp->grada, 2) + 2*dp->gradab + pow(dp->gradb, 2);
+  const real t1 = 2*dp->rhoa*dp->rhob;
+
+  ds->df1000 += (dp->rhob*t0)*factor;
+  ds->df0100 += (dp->rhoa*t0)*factor;
+  ds->df0010 += (dp->grada*t1)*factor;
+  ds->df0001 += (dp->gradb*t1)*factor;
+  ds->df00001 += (t1)*factor;
+}}
+"""
+    assert gga2x.gradient() == reference
+
+
+def test_gga2x_parallel(gga2x):
+    serial = str(gga2x)
+    ra, rb, ga, gb, gab = gga2x.variables
+    parallel = GeneralFunctional(
+        "Example2x", ra, rb, ga, gb, gab, gga2x.F, processes=2
+    )
+    assert str(parallel) == serial
+
+
+def test_gga2x_batch_drops_zeros(gga2x):
+    code = gga2x.batch_code(2)
+    assert 'out[4*n + i] += (2*rhoa[i]*rhob[i])*factor;' in code
+    # df2000 vanishes
+    assert 'out[5*n + i]' not in code
+    assert 'dp->' not in code
+
+
+def test_gga2x_write(gga2x):
+    output = io.StringIO()
+    gga2x.write(output)
+    assert output.getvalue() == str(gga2x)
+    assert "  // ds->df2000 += (0)*factor;\n" in output.getvalue()
+
+
+def test_gga2x_write_drops_codes(gga2x):
+    output = io.StringIO()
+    gga2x.write(output)
+    assert gga2x.dF in gga2x.tables()
+    assert not any(table._codes for table in gga2x.tables())
+    assert len(gga2x.dF) > 10
+    assert output.getvalue() == str(gga2x)
+    assert gga2x.dF._codes
+
+
+def test_gga2x_derivative_lines_lazy(gga2x):
+    lines = gga2x.derivative_lines(4)
+    while not next(lines).startswith('  ds->'):
+        pass
+    assert len(gga2x.dF) < 10
+    assert list(lines)[-1] == '}'
+    assert len(gga2x.dF) > 10
+
+
+def test_gga2x_shared(gga2x):
+    gga2x.shared = True
+    reference = """
+static inline void
+example2x_intermediates(const FunDensProp* dp, real* s)
+{
+  s[0] = pow(dp->grada, 2) + 2*dp->gradab + pow(dp->gradb, 2);
+  s[1] = 2*dp->rhob;
+  s[2] = dp->rhoa*s[1];
+}
+"""
+    assert gga2x.intermediates_code() == reference
+    assert reference in str(gga2x)
+
+    hessian = gga2x.hessian()
+    assert "  example2x_intermediates(dp, s);\n  const real t3 = 2*dp->rhoa;\n" in hessian
+    assert "  ds->df1100 += (s[0])*factor;" in hessian
+    assert "  ds->df01001 += (t3)*factor;" in hessian
+
+
+def test_separate(symbols):
+    ra, rb, ga, gb, gab = symbols
+    assert separate(ra*ga + rb**2 + 1, (ra, ga), (rb, gb)) == (ra*ga + 1, rb**2)
+    assert separate(ra*rb, (ra, ga), (rb, gb)) is None
+
+
+def test_separable_as_gga(symbols):
+    ra, rb, ga, gb, gab = symbols
+    general = GeneralFunctional("Example2", ra, rb, ga, gb, gab, ra*ga*ga + rb*gb*gb)
+    gga = GGAFunctional("Example2", ra, rb, ga, gb, ra*ga*ga, rb*gb*gb)
+    assert general.separable
+    assert general.gradient() == gga.gradient()
+    assert general.third() == comment_zero_lines(gga.third())
+
+
+def test_not_separable_with_gab(symbols):
+    ra, rb, ga, gb, gab = symbols
+    general = GeneralFunctional("X", ra, rb, ga, gb, gab, ra*ga + rb*gab)
+    assert not general.separable
+
+
+def test_separable_disabled(symbols):
+    ra, rb, ga, gb, gab = symbols
+    general = GeneralFunctional("X", ra, rb, ga, gb, gab, ra + rb, separable=False)
+    assert not general.separable
+    assert 'df1100' in general.hessian()
+
+
+def test_rationalize_general(symbols):
+    ra, rb, ga, gb, gab = symbols
+    F = (ra * rb)**(4 / 3) * gab
+    functional = GeneralFunctional("X", ra, rb, ga, gb, gab, F, rationalize=True)
+    assert functional.F == (ra * rb)**sympy.Rational(4, 3) * gab
+    assert functional.dF.expr == functional.F
+    assert list(functional.conversions.values()) == [sympy.Rational(4, 3)]
+
+
+def test_gga2x_parallel_cse(gga2x):
+    ra, rb, ga, gb, gab = gga2x.variables
+    F = sympy.exp(-ra * ga) * gab + sympy.sqrt(rb * gb)
+    serial = GeneralFunctional("G", ra, rb, ga, gb, gab, F, cse=True)
+    parallel = GeneralFunctional("G", ra, rb, ga, gb, gab, F, cse=True, processes=2)
+    assert parallel.third() == serial.third()
+
+
+def test_gga2x_parallel_taylor(gga2x):
+    ra, rb, ga, gb, gab = gga2x.variables
+    F = sympy.exp(-ra * ga) * gab + sympy.sqrt(rb * gb)
+    serial = GeneralFunctional("G", ra, rb, ga, gb, gab, F, taylor=True)
+    parallel = GeneralFunctional("G", ra, rb, ga, gb, gab, F, taylor=True, processes=2)
+    assert parallel.third() == serial.third()
+    # F is evaluated on Taylor numbers, its derivatives are not needed
+    assert len(parallel.dF) == 1
+    hoisted = GeneralFunctional("G", ra, rb, ga, gb, gab, F, hoist_powers=True, processes=2)
+    hoisted.third()
+    assert len(hoisted.dF) > 1
+    assert not hoisted.dF._codes
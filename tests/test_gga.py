@@ -171,3 +171,10 @@ example2_fourth(FunFourthFuncDrv *ds, real factor, const FunDensProp* dp)
 """
 
     assert gga2.fourth() == reference
+
+
+def test_gga_rationalize(gga2):
+    ra, rb, ga, gb = gga2.variables
+    exact = GGAFunctional("B", ra, rb, ga, gb, ra**(4 / 3) * ga, rb**(4 / 3) * gb, rationalize=True)
+    assert exact.Fb == rb**sympy.Rational(4, 3) * gb
+    assert exact.dFb.expr == exact.Fb
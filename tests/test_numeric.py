@@ -0,0 +1,89 @@
+import sympy
+
+import pytest
+
+from xcdiff import Functional, GeneralFunctional
+
+numpy = pytest.importorskip('numpy')
+numeric = pytest.importorskip('xcdiff.numeric')
+
+
+@pytest.fixture
+def grid():
+    rng = numpy.random.default_rng(1)
+    return {
+        name: rng.uniform(0.1, 2.0, 1000)
+        for name in ('rhoa', 'rhob', 'grada', 'gradb', 'gradab')
+    }
+
+
+def test_general_components(symbols, grid):
+    ra, rb, ga, gb, gab = symbols
+    F = ra * rb * (ga * ga + gb * gb + 2 * gab) + sympy.exp(-ra * gb)
+    functional = GeneralFunctional("Example2x", ra, rb, ga, gb, gab, F)
+    values = numeric.NumpyBackend(functional, order=2)(chunk_size=128, **grid)
+
+    assert len(values) == 1 + 5 + 15
+    i = 17
+    point = {v: grid[str(v)[4:]][i] for v in symbols}
+    assert values['energy'][i] == pytest.approx(float(F.subs(point)))
+    assert values['df10001'][i] == pytest.approx(float(F.diff(ra, gab).subs(point)))
+    assert values['df1001'][i] == pytest.approx(float(F.diff(ra, gb).subs(point)))
+    assert values['df2000'][i] == pytest.approx(float(F.diff(ra, 2).subs(point)))
+
+
+def test_chunks(symbols, grid):
+    ra, rb, ga, gb, gab = symbols
+    F = ra * rb * (ga * ga + gb * gb + 2 * gab)
+    backend = numeric.NumpyBackend(GeneralFunctional("Example2x", ra, rb, ga, gb, gab, F))
+    whole = backend(**grid)
+    chunked = backend(chunk_size=7, **grid)
+    for label in whole:
+        numpy.testing.assert_array_equal(whole[label], chunked[label])
+
+
+def test_threshold(symbols):
+    ra, rb, *_ = symbols
+    slater = Functional("Slater", ra, rb, -ra**(4 / 3), -rb**(4 / 3), threshold=1e-20)
+    values = numeric.NumpyBackend(slater, order=2)(rhoa=[0.0, 1.0], rhob=[1.0, 0.0])
+    numpy.testing.assert_allclose(values['energy'], [-1.0, -1.0])
+    numpy.testing.assert_allclose(values['df1000'], [0.0, -4 / 3])
+    numpy.testing.assert_allclose(values['df0200'], [-4 / 9, 0.0])
+
+
+def test_constants(symbols):
+    ra, rb, ga, gb, _ = symbols
+    from xcdiff import ExampleFunctional
+    example = ExampleFunctional("Example2", ra, rb, ga, gb, ra * ga * ga, rb * gb * gb)
+    backend = numeric.NumpyBackend(example, constants={'EPREF': -2.0})
+    values = backend(rhoa=1.0, rhob=1.0, grada=3.0, gradb=0.0)
+    assert values['df1000'] == pytest.approx(-18.0)
+    assert values['energy'] == pytest.approx(-18.0)
+
+
+def test_constants_in_expressions(symbols):
+    ra, rb, *_ = symbols
+    C = sympy.Symbol('C')
+    lda = Functional("LDA", ra, rb, C * ra**2, C * rb**2)
+    backend = numeric.NumpyBackend(lda, constants={'C': 3.0})
+    values = backend(rhoa=2.0, rhob=1.0)
+    assert values['energy'] == pytest.approx(15.0)
+    assert values['df1000'] == pytest.approx(12.0)
+
+
+def test_unknown_symbols(symbols):
+    ra, rb, ga, gb, _ = symbols
+    from xcdiff import ExampleFunctional
+    example = ExampleFunctional("Example2", ra, rb, ga, gb, ra * ga * ga, rb * gb * gb)
+    with pytest.raises(ValueError, match='EPREF'):
+        numeric.NumpyBackend(example)
+    C = sympy.Symbol('C')
+    with pytest.raises(ValueError, match='C'):
+        numeric.NumpyBackend(Functional("LDA", ra, rb, C * ra**2, C * rb**2))
+
+
+def test_missing_array(symbols):
+    ra, rb, *_ = symbols
+    backend = numeric.NumpyBackend(Functional("Slater", ra, rb, ra, rb))
+    with pytest.raises(TypeError):
+        backend(rhoa=[1.0])
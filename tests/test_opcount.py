@@ -0,0 +1,69 @@
+import csv
+import io
+import json
+
+import pytest
+
+from xcdiff import opcount
+from xcdiff.benchmark import slater
+
+
+def test_components():
+    functional = slater()
+    rows = opcount.components(functional, orders=(1, 2))
+    assert [(row['order'], row['label']) for row in rows] == [
+        (1, 'df1000'), (1, 'df0100'), (2, 'df2000'), (2, 'df0200'),
+    ]
+    first = rows[0]
+    assert first['functional'] == 'slater'
+    assert first['order'] == 1
+    assert first['pow'] == 2
+    assert first['exp'] == first['log'] == 0
+    assert first['ops'] > 0
+    assert first['chars'] == len(functional.dFa.code((functional.ra,)))
+
+
+def test_run_sorted():
+    rows = opcount.run(['slater', 'b88'], orders=(1,))
+    ops = [row['ops'] for row in rows]
+    assert ops == sorted(ops, reverse=True)
+    assert rows[0]['functional'] == 'b88'
+
+
+def test_csv():
+    rows = opcount.run(['slater'], orders=(1,))
+    table = list(csv.DictReader(io.StringIO(opcount.to_csv(rows))))
+    assert tuple(table[0]) == opcount.FIELDS
+    assert table[0]['label'] == 'df1000'
+
+
+def test_main(tmp_path, capsys):
+    output = tmp_path / 'components.json'
+    argv = ['--only', 'slater', '--orders', '1', '--format', 'json', '--output', str(output)]
+    assert opcount.main(argv) == 0
+    assert len(json.loads(output.read_text())) == 2
+    assert opcount.main(['--only', 'example2', '--orders', '2', '--top', '1']) == 0
+    assert len(capsys.readouterr().out.splitlines()) == 2
+
+
+def test_components_once():
+    rows = opcount.components(slater(), orders=(3, 1, 2))
+    assert [row['order'] for row in rows] == [1, 1, 2, 2, 3, 3]
+
+
+def test_catalog(tmp_path, capsys):
+    path = tmp_path / 'catalog.json'
+    path.write_text(json.dumps([{
+        "name": "Quartic",
+        "class": "Functional",
+        "Fa": "rhoa**4",
+        "Fb": "rhob**4",
+        "options": {"cse": True},
+    }]))
+    rows = opcount.run(['quartic'], orders=(1, 2), path=path)
+    assert {row['functional'] for row in rows} == {'quartic'}
+    assert len(rows) == 4
+    assert opcount.main(['--catalog', str(path), '--orders', '1']) == 0
+    assert 'quartic' in capsys.readouterr().out
+    with pytest.raises(SystemExit):
+        opcount.main(['--catalog', str(path), '--only', 'slater'])
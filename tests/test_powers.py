@@ -0,0 +1,71 @@
+from fractions import Fraction
+
+import sympy
+
+import pytest
+
+from xcdiff.powers import fraction, hoist, rationalize
+
+
+@pytest.mark.parametrize(
+    'exponent, expected',
+    [
+        (sympy.Float(0.33333333333333326), Fraction(1, 3)),
+        (sympy.Float(-0.66666666666666674), Fraction(-2, 3)),
+        (sympy.Rational(-3, 2), Fraction(-3, 2)),
+        (sympy.Rational(7, 6), Fraction(7, 6)),
+        (sympy.Integer(2), None),
+        (sympy.Float(1.7), None),
+        (sympy.Symbol('x'), None),
+    ]
+)
+def test_fraction(exponent, expected):
+    assert fraction(exponent) == expected
+
+
+def test_hoist():
+    x, y = sympy.symbols('dp->rhoa, dp->rhob')
+    exprs = [x**sympy.Rational(4, 3) * y, x**sympy.Rational(-2, 3) + y**2, sympy.sqrt(x) * y]
+    definitions, hoisted = hoist(exprs, sympy.numbered_symbols('t'))
+    assert [(str(t), code) for t, code in definitions] == [
+        ('t0', 'cbrt(sqrt(dp->rhoa))'),
+        ('t0_2', 't0*t0'),
+        ('t0_4', 't0_2*t0_2'),
+        ('t0_8', 't0_4*t0_4'),
+        ('t0_m4', '1.0/t0_4'),
+        ('t0_3', 't0_2*t0'),
+    ]
+    assert [sympy.ccode(e) for e in hoisted] == [
+        'dp->rhob*t0_8', 'pow(dp->rhob, 2) + t0_m4', 'dp->rhob*t0_3'
+    ]
+
+
+def test_hoist_nested():
+    x = sympy.Symbol('dp->rhoa')
+    expr = (1 + x**sympy.Rational(1, 3))**sympy.Rational(1, 2)
+    definitions, hoisted = hoist([expr], sympy.numbered_symbols('t'))
+    assert definitions == [
+        (sympy.Symbol('t0'), 'cbrt(dp->rhoa)'),
+        (sympy.Symbol('t1'), 'sqrt(t0 + 1)'),
+    ]
+    assert hoisted == [sympy.Symbol('t1')]
+
+
+def test_hoist_constant_base():
+    expr = sympy.pi**sympy.Rational(1, 3) * sympy.Symbol('x')
+    assert hoist([expr], sympy.numbered_symbols('t')) == ([], [expr])
+
+
+def test_rationalize():
+    x = sympy.Symbol('x')
+    expr = x**(4 / 3) + x**1.7 + x**0.123456789
+    exact, conversions = rationalize(expr)
+    assert exact == x**sympy.Rational(4, 3) + x**sympy.Rational(17, 10) + x**0.123456789
+    assert conversions == {
+        sympy.Float(4 / 3): sympy.Rational(4, 3), sympy.Float(1.7): sympy.Rational(17, 10)
+    }
+
+
+def test_rationalize_exact():
+    x = sympy.Symbol('x')
+    assert rationalize(x**sympy.Rational(1, 3)) == (x**sympy.Rational(1, 3), {})
@@ -0,0 +1,32 @@
+import re
+
+import sympy
+
+from xcdiff.benchmark import pbex
+from xcdiff.printer import ccode
+
+
+def test_small_integers():
+    x = sympy.Symbol('x')
+    assert ccode(3*x) == sympy.ccode(3*x)
+    assert ccode(x + 2**63 - 1) == f'x + {2**63 - 1}'
+    assert ccode(x - 2**63 + 1) == f'x - {2**63 - 1}'
+
+
+def test_large_integers():
+    x = sympy.Symbol('x')
+    assert ccode(20940000000000000000*x) == '20940000000000000000.0*x'
+    assert ccode(x - 2**63) == f'x - {2**63}.0'
+    assert ccode(sympy.Integer(-2**64)) == f'-{2**64}.0'
+
+
+def test_pbex_literals():
+    code = pbex().fourth()
+    integers = [int(n) for n in re.findall(r'(?<![\w.])\d+(?![\w.])', code)]
+    assert max(integers) < 2**63
+    assert re.search(r'(?<![\w.])\d{20,}\.0', code)
+
+
+def test_pbex_matches_taylor(fourth_derivatives):
+    for a, b in fourth_derivatives(pbex(), pbex(taylor=True)):
+        assert abs(a - b) / (abs(a) + 1e-12) < 1e-10
@@ -223,3 +223,125 @@ slater_fourth(FunFourthFuncDrv *ds, real factor, const FunDensProp* dp)
 """
 
     assert slater.fourth() == reference
+
+
+def test_slater_cse_hessian(slater):
+    slater.cse = True
+    reference = f"""
+static void
+slater_second(FunSecondFuncDrv *ds, real factor, const FunDensProp* dp)
+{{
+  if (dp->rhoa>SLATER_THRESHOLD) {{
+     const real t0 = pow(M_PI, -0.33333333333333331);
+
+     ds->df1000 += (-1.8171205928321394*pow(dp->rhoa, 0.33333333333333326)*t0)*factor;
+     ds->df2000 += (-0.60570686427737963*pow(dp->rhoa, -0.66666666666666674)*t0)*factor;
+     }}
+  if (dp->rhob>SLATER_THRESHOLD) {{
+     const real t1 = pow(M_PI, -0.33333333333333331);
+
+     ds->df0100 += (-1.8171205928321394*pow(dp->rhob, 0.33333333333333326)*t1)*factor;
+     ds->df0200 += (-0.60570686427737963*pow(dp->rhob, -0.66666666666666674)*t1)*factor;
+     }}
+}}
+"""
+    assert slater.hessian() == reference
+
+
+def test_slater_spin_symmetry(slater):
+    ra, rb = slater.ra, slater.rb
+    symmetric = Functional(
+        "Slater", ra, rb, slater.Fa, slater.Fb, threshold=1e-20,
+        info=slater.info, spin_symmetry=True
+    )
+    assert symmetric.dFb.source is symmetric.dFa
+    assert str(symmetric) == str(slater)
+
+
+def test_slater_gradient_batch(slater):
+    reference = """
+/* out[k*n + i]: 0 df1000, 1 df0100 */
+void
+slater_first_batch(integer n, real factor, const real* restrict rhoa, const real* restrict rhob, real* restrict out)
+{
+  integer i;
+  for (i = 0; i < n; i++) {
+     if (rhoa[i]>SLATER_THRESHOLD)
+        out[0*n + i] += (-1.8171205928321394*pow(M_PI, -0.33333333333333331)*pow(rhoa[i], 0.33333333333333326))*factor;
+     if (rhob[i]>SLATER_THRESHOLD)
+        out[1*n + i] += (-1.8171205928321394*pow(M_PI, -0.33333333333333331)*pow(rhob[i], 0.33333333333333326))*factor;
+  }
+}
+"""
+
+    assert slater.batch_code(1) == reference
+
+
+def test_slater_hoist_powers(slater):
+    slater.hoist_powers = True
+    reference = """
+static void
+slater_second(FunSecondFuncDrv *ds, real factor, const FunDensProp* dp)
+{
+  if (dp->rhoa>SLATER_THRESHOLD) {
+     const real t0 = cbrt(dp->rhoa);
+     const real t0_2 = t0*t0;
+     const real t0_m2 = 1.0/t0_2;
+
+     ds->df1000 += (-1.8171205928321394*pow(M_PI, -0.33333333333333331)*t0)*factor;
+     ds->df2000 += (-0.60570686427737963*pow(M_PI, -0.33333333333333331)*t0_m2)*factor;
+     }
+  if (dp->rhob>SLATER_THRESHOLD) {
+     const real t1 = cbrt(dp->rhob);
+     const real t1_2 = t1*t1;
+     const real t1_m2 = 1.0/t1_2;
+
+     ds->df0100 += (-1.8171205928321394*pow(M_PI, -0.33333333333333331)*t1)*factor;
+     ds->df0200 += (-0.60570686427737963*pow(M_PI, -0.33333333333333331)*t1_m2)*factor;
+     }
+}
+"""
+    assert slater.hessian() == reference
+
+
+def test_slater_rationalize(slater):
+    ra, rb = slater.ra, slater.rb
+    exact = Functional(
+        "Slater", ra, rb, slater.Fa, slater.Fb, threshold=1e-20, rationalize=True
+    )
+    assert exact.Fa.has(ra**sympy.Rational(4, 3))
+    assert "    exponent 1.3333333333333333 -> 4/3\n" in exact.header()
+    assert (
+        "     ds->df2000 += (-0.60570686427737985/(cbrt(M_PI)*pow(dp->rhoa, 2.0/3.0)))*factor;"
+        in exact.hessian()
+    )
+    assert slater.conversion_report() == ''
+
+
+def test_slater_max_order(slater):
+    ra, rb = slater.ra, slater.rb
+    limited = Functional(
+        "Slater", ra, rb, slater.Fa, slater.Fb, threshold=1e-20, max_order=2
+    )
+    code = str(limited)
+    assert len(limited.dFa) == 3
+    assert limited.orders() == [1, 2]
+    assert '#include <stdio.h>\n#include <stdlib.h>\n#include "general.h"' in code
+    assert '  slater_isgga,   /* gga-corrected */\n   2,\n' in code
+    assert limited.hessian() == slater.hessian()
+    assert limited.third() == """
+static void
+slater_third(FunThirdFuncDrv *ds, real factor, const FunDensProp* dp)
+{
+  (void)ds; (void)factor; (void)dp;
+  fprintf(stderr, "Slater: third derivatives not generated (max_order 2)\\n");
+  abort();
+}
+"""
+    assert '<stdlib.h>' not in str(slater)
+    assert '   3,\n' in slater.interface()
+
+
+def test_slater_max_order_invalid(slater):
+    with pytest.raises(ValueError, match='max_order 5'):
+        Functional("Slater", slater.ra, slater.rb, slater.Fa, slater.Fb, max_order=5)
@@ -0,0 +1,115 @@
+import shutil
+
+import sympy
+
+import pytest
+
+from xcdiff import GeneralFunctional, GGAFunctional
+from xcdiff.strategy import DIVISION, LIBM, SQRT, flops, report
+
+
+def test_flops(symbols):
+    ra, rb, ga, *_ = symbols
+    assert flops(ra) == 0
+    assert flops(ra + rb + ga) == 2
+    assert flops(3 * ra * rb) == 2
+    assert flops(ra**3) == 2
+    assert flops(1 / ra**2) == 1 + DIVISION
+    assert flops(sympy.sqrt(ra)) == SQRT
+    assert flops(ra**sympy.Rational(4, 3)) == LIBM
+    assert flops(sympy.exp(ra * rb)) == 1 + LIBM
+
+
+def test_report():
+    estimates = {1: {'expanded': {'cost': 10, 'lines': 3}, 'cse': {'cost': 8, 'lines': 5}}}
+    assert report(estimates, {1: 'cse'}) == (
+        "    order 1: cse [expanded 10 (3 lines), cse 8 (5 lines)]\n"
+    )
+
+
+def test_fixed_strategy(symbols):
+    ra, rb, ga, gb, _ = symbols
+    F = sympy.asinh(ga / ra**sympy.Rational(4, 3))
+    cse = GGAFunctional("G", ra, rb, ga, gb, F, F.subs({ra: rb, ga: gb}), cse=True)
+    chosen = GGAFunctional("G", ra, rb, ga, gb, F, F.subs({ra: rb, ga: gb}), strategy='cse')
+    assert chosen.hessian() == cse.hessian()
+    assert 'order' not in chosen.header()
+
+
+def test_auto(symbols):
+    ra, rb, ga, gb, _ = symbols
+    F = sympy.asinh(ga / ra**sympy.Rational(4, 3))
+    gga = GGAFunctional("G", ra, rb, ga, gb, F, F.subs({ra: rb, ga: gb}), strategy='auto')
+    code = str(gga)
+    estimates = gga.estimate(3)
+    assert set(estimates) == {'expanded', 'cse', 'taylor'}
+    assert estimates['cse']['cost'] < estimates['expanded']['cost']
+    assert gga.select(3) == 'cse'
+    assert "    order 3: cse [expanded" in gga.header()
+    assert gga.third() in code
+
+
+def test_auto_without_taylor(symbols):
+    ra, rb, ga, gb, gab = symbols
+    F = sympy.Piecewise((ra * ga, ra > rb), (rb * gb, True)) + gab
+    general = GeneralFunctional("G", ra, rb, ga, gb, gab, F, strategy='auto')
+    code = str(general)
+    estimates = general.estimate(2)
+    assert estimates['taylor'] == {'error': 'no Taylor arithmetic for Piecewise'}
+    assert general.select(2) in ('expanded', 'cse')
+    assert "taylor unavailable (no Taylor arithmetic for Piecewise)]" in general.header()
+    assert 'taylor_compose' not in code
+    with pytest.raises(NotImplementedError, match='Piecewise'):
+        general.emit(2, 'taylor')
+
+
+def test_report_unavailable():
+    estimates = {1: {'cse': {'cost': 8, 'lines': 5}, 'taylor': {'error': 'no Taylor arithmetic'}}}
+    assert report(estimates, {1: 'cse'}) == (
+        "    order 1: cse [cse 8 (5 lines), taylor unavailable (no Taylor arithmetic)]\n"
+    )
+
+
+def test_auto_general_zero_lines(symbols):
+    ra, rb, ga, gb, gab = symbols
+    general = GeneralFunctional("G", ra, rb, ga, gb, gab, ra * rb + ga * gb, strategy='auto')
+    assert "  // ds->df2000 += (0)*factor;\n" in general.hessian()
+    assert "// // " not in str(general)
+
+
+def test_auto_max_order(symbols):
+    ra, rb, ga, gb, _ = symbols
+    F = sympy.asinh(ga / ra**sympy.Rational(4, 3))
+    gga = GGAFunctional(
+        "G", ra, rb, ga, gb, F, F.subs({ra: rb, ga: gb}), strategy='auto', max_order=1
+    )
+    assert 'abort();' in str(gga)
+    assert list(gga.estimates) == [1]
+
+
+def test_emit_leaves_functional_unchanged(symbols):
+    ra, rb, ga, gb, _ = symbols
+    F = sympy.asinh(ga / ra**sympy.Rational(4, 3))
+    gga = GGAFunctional("G", ra, rb, ga, gb, F, F.subs({ra: rb, ga: gb}))
+    expanded = gga.hessian()
+    lines = gga.derivative_lines(2)
+    head = [next(lines) for _ in range(6)]
+    assert 'taylor_compose' in gga.emit(2, 'taylor')
+    assert 'const real t0' in gga.emit(2, 'cse')
+    assert '\n'.join([*head, *lines]) + '\n' == expanded
+    assert (gga.cse, gga.taylor, gga.strategy) == (False, False, None)
+
+
+@pytest.mark.skipif(shutil.which('cc') is None, reason='no C compiler')
+def test_auto_benchmark(symbols):
+    ra, rb, ga, gb, _ = symbols
+    F = sympy.asinh(ga / ra**sympy.Rational(4, 3))
+    gga = GGAFunctional(
+        "G", ra, rb, ga, gb, F, F.subs({ra: rb, ga: gb}), strategy='auto', benchmark=True,
+        max_order=2
+    )
+    code = str(gga)
+    assert set(gga.timings()) == {'expanded', 'cse', 'taylor'}
+    assert all('time' in e for e in gga.estimate(2).values())
+    assert gga.strategy == 'auto'
+    assert gga.hessian() in code
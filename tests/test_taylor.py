@@ -0,0 +1,83 @@
+import math
+
+import sympy
+
+from xcdiff import GeneralFunctional, GGAFunctional
+from xcdiff.benchmark import example3
+from xcdiff.taylor import Expansion, indices, pairs, runtime
+
+
+def test_indices():
+    assert indices(2, 2) == [(0, 0), (1, 0), (0, 1), (2, 0), (1, 1), (0, 2)]
+    assert len(indices(5, 4)) == 126
+
+
+def test_pairs():
+    assert pairs(1, 2) == [(0, 0, 0), (0, 1, 1), (0, 2, 2), (1, 0, 1), (1, 1, 2), (2, 0, 2)]
+    assert len(pairs(5, 4)) == 1001
+
+
+def test_runtime():
+    code = runtime({(1, 2), (2, 4)})
+    assert '#define TAYLOR_MAX 15' in code
+    assert 'static const TaylorSpace taylor_1_2 = {3, 2, 6, taylor_1_2_pairs};' in code
+    assert 'static const TaylorSpace taylor_2_4 = {15, 4, 70, taylor_2_4_pairs};' in code
+
+
+def test_expansion(symbols):
+    ra, _, ga, *_ = symbols
+    expansion = Expansion((ra, ga), 2, sympy.numbered_symbols('t'))
+    assert expansion.program(3 * ra * ga**2 + sympy.exp(ra)) == [
+        'real t0[6];',
+        'taylor_variable(&taylor_2_2, t0, dp->rhoa, 1);',
+        'real t1[6];',
+        'taylor_variable(&taylor_2_2, t1, dp->grada, 2);',
+        'real t2[6];',
+        'taylor_mul(&taylor_2_2, t2, t1, t1);',
+        'real t3[6];',
+        'taylor_mul(&taylor_2_2, t3, t0, t2);',
+        'taylor_affine(&taylor_2_2, t3, 3, t3, 0);',
+        'real t4[6];',
+        'const real t4_d[] = {exp(t0[0]), exp(t0[0]), (1.0/2.0)*exp(t0[0])};',
+        'taylor_compose(&taylor_2_2, t4, t0, t4_d);',
+        'real t5[6];',
+        'taylor_linear(&taylor_2_2, t5, 1, t3, 1, t4);',
+    ]
+    assert expansion.derivative((ra,)) == 't5[1]'
+    assert expansion.derivative((ga, ga)) == '2*t5[5]'
+
+
+def test_constant(symbols):
+    ra, rb, ga, gb, _ = symbols
+    expansion = Expansion((ra,), 2, sympy.numbered_symbols('t'))
+    assert expansion.program(sympy.Integer(0)) == ['real t0[3] = {0};']
+    assert expansion.derivative((ra, ra)) == '2*t0[2]'
+    # Fa = 0 of a functional of the beta density only
+    gga = GGAFunctional("B", ra, rb, ga, gb, sympy.Integer(0), rb * gb**2, taylor=True)
+    assert 'real t0[3] = {0};' in gga.gradient()
+
+
+def test_taylor_gradient(symbols):
+    ra, rb, ga, gb, _ = symbols
+    gga = GGAFunctional("G", ra, rb, ga, gb, ra * ga, rb * gb, taylor=True)
+    assert "  ds->df1000 += (t2[1])*factor;\n  ds->df0010 += (t2[2])*factor;\n" in gga.gradient()
+    assert 'TaylorSpace taylor_2_4 =' in str(gga)
+
+
+def test_taylor_matches_symbolic(symbols, fourth_derivatives):
+    ra, rb, ga, gb, gab = symbols
+    F = (
+        ra**sympy.Rational(4, 3) * sympy.asinh(ga / ra) + sympy.exp(-ra * rb) * gab**2
+        + sympy.log(1 + gb) * rb**sympy.Rational(1, 2)
+    )
+    symbolic = GeneralFunctional("G", ra, rb, ga, gb, gab, F)
+    taylor = GeneralFunctional("G", ra, rb, ga, gb, gab, F, taylor=True)
+    for a, b in fourth_derivatives(symbolic, taylor):
+        assert abs(a - b) / (abs(a) + 1e-12) < 1e-12
+
+
+def test_taylor_infinite_derivative(fourth_derivatives):
+    values = fourth_derivatives(example3(), example3(taylor=True), (0.3, 0.7, 0.0, 0.05, 0.01))
+    assert any(math.isinf(a) for a, _ in values)
+    for a, b in values:
+        assert a == b or math.isclose(a, b, rel_tol=1e-12)
@@ -0,0 +1,55 @@
+import json
+import os
+import subprocess
+import sys
+
+from xcdiff import GeneralFunctional, trace
+from xcdiff.benchmark import example2, slater, symbols
+from xcdiff.general import comment_zero_lines
+
+
+def test_off():
+    assert trace._recorder is None
+    with trace.span('diff'):
+        pass
+
+
+def test_tracing(tmp_path):
+    path = tmp_path / 'trace.json'
+    with trace.tracing(path) as recorder:
+        str(example2())
+    assert trace._recorder is None
+    names = {event['name'] for event in recorder.events}
+    assert {'header', 'energy', 'gradient', 'fourth', 'diff', 'ccode', 'df1000'} <= names
+    events = json.loads(path.read_text())['traceEvents']
+    assert len(events) == len(recorder.events)
+    gradient, = (event for event in events if event['name'] == 'gradient')
+    assert gradient['ph'] == 'X'
+    assert gradient['dur'] > 0
+    assert 'allocated' in gradient['args']
+
+
+def test_general():
+    ra, rb, ga, gb, gab = symbols()
+    with trace.tracing(memory=False) as recorder:
+        comment_zero_lines(GeneralFunctional("G", ra, rb, ga, gb, gab, ra * rb * gab).hessian())
+    assert 'comment_zero_lines' in {event['name'] for event in recorder.events}
+
+
+def test_nested_spans():
+    with trace.tracing(memory=False) as recorder:
+        slater().gradient()
+    component, = (event for event in recorder.events if event['name'] == 'df1000')
+    diff = next(event for event in recorder.events if event['name'] == 'diff')
+    assert component['cat'] == 'component'
+    assert component['ts'] <= diff['ts'] <= component['ts'] + component['dur']
+    assert 'allocated' not in component['args']
+
+
+def test_environment(tmp_path):
+    path = tmp_path / 'trace.json'
+    env = dict(os.environ, XCDIFF_TRACE=str(path), XCDIFF_TRACE_MEMORY='0')
+    code = 'from xcdiff.benchmark import slater; slater().gradient()'
+    subprocess.run([sys.executable, '-c', code], env=env, check=True)
+    names = {event['name'] for event in json.loads(path.read_text())['traceEvents']}
+    assert {'diff', 'ccode', 'df1000'} <= names
@@ -0,0 +1,54 @@
+import sympy
+
+import pytest
+
+from xcdiff import GeneralFunctional, GGAFunctional
+
+pytest.importorskip('numpy')
+verify = pytest.importorskip('xcdiff.verify')
+
+
+@pytest.fixture
+def general(symbols):
+    ra, rb, ga, gb, gab = symbols
+    F = ra * rb * (ga * ga + gb * gb + 2 * gab) + sympy.exp(-ra * gb) * ra ** (4 / 3)
+    return GeneralFunctional("Heavy", ra, rb, ga, gb, gab, F)
+
+
+def test_differences(general):
+    pairs = verify.differences(general, 2)
+    assert pairs['df1000'] == ('energy', general.ra)
+    assert pairs['df10001'] == ('df00001', general.ra)
+    assert len(pairs) == 5 + 15
+
+
+def test_sample(general):
+    grid = verify.sample(general, 100, seed=1)
+    assert set(grid) == {'rhoa', 'rhob', 'grada', 'gradb', 'gradab'}
+    assert (abs(grid['gradab']) <= grid['grada'] * grid['gradb']).all()
+
+
+def test_verify(general):
+    errors = verify.verify(general, order=3, points=1000, seed=1)
+    assert len(errors) == 5 + 15 + 35
+    assert max(errors.values()) < 1e-4
+    assert 'FAIL' not in verify.report(errors)
+
+
+def test_verify_detects_error(symbols):
+    ra, rb, ga, gb, _ = symbols
+    gga = GGAFunctional("B", ra, rb, ga, gb, ra**(4 / 3) * sympy.log(1 + ga**2), rb * gb)
+    gga.dFa[ra, ga]
+    gga.dFa._derivatives[gga.dFa.key((ra, ga))] *= 1.01
+    errors = verify.verify(gga, order=2, points=1000, seed=1)
+    assert errors['df1010'] > 1e-3
+    assert errors['df2000'] < 1e-4
+    assert 'df1010      ' in verify.report(errors) and 'FAIL' in verify.report(errors)
+
+
+def test_verify_constants(symbols):
+    ra, rb, ga, gb, _ = symbols
+    C = sympy.Symbol('C')
+    gga = GGAFunctional("B", ra, rb, ga, gb, C * ra * sympy.log(1 + ga**2), C * rb * gb)
+    errors = verify.verify(gga, order=2, points=1000, seed=1, constants={'C': 0.5})
+    assert max(errors.values()) < 1e-4
@@ -1,8 +1,11 @@
+__version__ = '0.1.0'
+
 from .base import BaseFunctional
 from .func import Functional
 from .gga import GGAFunctional
 from .general import GeneralFunctional
 from .example import ExampleFunctional
+from .combined import CombinedFunctional
 
 
 
@@ -1,9 +1,60 @@
+import contextlib
+import hashlib
+import itertools
+import json
+import os
+import re
+import subprocess
 import textwrap
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple
 
-from sympy import Symbol
+import sympy
+from sympy import Symbol, srepr
+
+from . import __version__, strategy, trace
+from .cache import DiskCache
+from .derivatives import DerivativeTable, ccodes, lattice
+from .powers import hoist, rationalize
+from .printer import ccode
+from .taylor import Expansion, runtime
+
+# bump when the emitted C changes for unchanged input, so that manifests
+# of generated files are invalidated
+TEMPLATE_VERSION = 2
+
+# keyword arguments that do not change the generated code
+RUNTIME_OPTIONS = ('cache_dir', 'processes')
+
+DERIVATIVE_FUNCTIONS = {
+    1: ('first', 'FunFirstFuncDrv'),
+    2: ('second', 'FunSecondFuncDrv'),
+    3: ('third', 'FunThirdFuncDrv'),
+    4: ('fourth', 'FunFourthFuncDrv'),
+}
+
+
+class Component(NamedTuple):
+    """
+    One ds->df... line of a derivative function
+    """
+    label: str
+    table: DerivativeTable
+    variables: tuple
+
+    @property
+    def expr(self) -> Symbol:
+        return self.table[self.variables]
+
+    @property
+    def code(self) -> str:
+        return self.table.code(self.variables)
 
 
 class BaseFunctional:
+
+    prefix = ''
+
     def __init__(
             self, name: str, ra: Symbol, rb: Symbol,
             Fa: Symbol, Fb: Symbol, **kwargs
@@ -12,26 +63,135 @@ class BaseFunctional:
         self.name = name.lower()
         self.ra = ra
         self.rb = rb
-        self.Fa = Fa
-        self.Fb = Fb
+        self.rationalize = kwargs.get('rationalize', False)
+        self.tolerance = kwargs.get('tolerance', 1e-10)
+        self.conversions = {}
+        self.Fa = Fa = self.normalize(Fa)
+        self.Fb = Fb = self.normalize(Fb)
         self.const = kwargs.get('const', '')
         self.threshold = kwargs.get('threshold')
         self.info = kwargs.get('info', '') 
+        self.cse = kwargs.get('cse', False)
+        self.shared = kwargs.get('shared', False)
+        self.hoist_powers = kwargs.get('hoist_powers', False)
+        self.taylor = kwargs.get('taylor', False)
+        self.strategy = kwargs.get('strategy')
+        self.benchmark = kwargs.get('benchmark', False)
+        self.estimates = {}
+        self.choices = {}
+        self._emitted = {}
+        self._timings = None
+        self._intermediates = None
+        self.processes = kwargs.get('processes')
+        cache_dir = kwargs.get('cache_dir', os.environ.get('XCDIFF_CACHE_DIR'))
+        self.cache = DiskCache(cache_dir) if cache_dir else None
+        self.spin_symmetry = kwargs.get('spin_symmetry', False)
+        self.max_order = kwargs.get('max_order')
+        if self.max_order is not None and self.max_order not in range(max(DERIVATIVE_FUNCTIONS) + 1):
+            raise ValueError(f'max_order {self.max_order} not in 0..{max(DERIVATIVE_FUNCTIONS)}')
+        self.options = {k: v for k, v in kwargs.items() if k not in RUNTIME_OPTIONS}
+        self.dFa = DerivativeTable(Fa, self.cache)
+        self.dFb = self.beta_table(Fb)
         self.gga = 0
+        self.variables = (ra, rb)
 
     def __str__(self):
-        return (
-            self.header() +
-            self.interface() +
-            self.read() +
-            self.energy() +
-            self.gradient() +
-            self.hessian() +
-            self.third() +
-            self.fourth()
+        return ''.join(self.chunks())
+
+    def write(self, fileobj):
+        """
+        Write the generated file as it is produced, the derivative functions
+        line by line, dropping the C code of each function once written:
+        beyond the derivative expressions, kept as the parents of those of
+        higher order, the C code of at most one function is held
+        """
+        for chunk in self.chunks():
+            fileobj.write(chunk)
+            if chunk == '}\n':
+                # end of a derivative function
+                for table in self.tables():
+                    table.drop_codes()
+
+    def tables(self) -> list:
+        """
+        Derivative tables of the functional
+        """
+        return [table for table in vars(self).values() if isinstance(table, DerivativeTable)]
+
+    def chunks(self, name: str = None):
+        """
+        Text of the generated file in pieces: the sections preceding the
+        derivative functions whole, then these line by line; name is a
+        strategy to emit with instead of that of the functional
+        """
+        with trace.span('header', functional=self.name):
+            yield self.header(name)
+        sections = [self.interface, self.read, self.energy]
+        if self.shared and self.orders():
+            sections.append(self.intermediates_code)
+        if self.taylor or 'taylor' in self.strategies(name).values():
+            sections.append(self.taylor_code)
+        for section in sections:
+            with trace.span(section.__name__, functional=self.name):
+                yield section()
+        for order, section in enumerate((self.gradient, self.hessian, self.third, self.fourth), 1):
+            with trace.span(section.__name__, functional=self.name):
+                for line in self.derivative_lines(order, name):
+                    yield line + '\n'
+
+    def digest(self) -> str:
+        """
+        Hash of the inputs of the generated file: class, name, variables,
+        expressions and options, and the template and xcdiff versions
+        """
+        inputs = {
+            'class': type(self).__name__,
+            'name': self.name_orig,
+            'variables': [srepr(v) for v in self.variables],
+            'exprs': [srepr(getattr(self, e, None)) for e in ('Fa', 'Fb', 'F')],
+            'options': self.options,
+            'template': TEMPLATE_VERSION,
+            'version': __version__,
+        }
+        data = json.dumps(inputs, sort_keys=True, default=repr)
+        return hashlib.sha256(data.encode()).hexdigest()
+
+    def normalize(self, expr: Symbol) -> Symbol:
+        """
+        Input expression with near-rational Float exponents, such as 4/3
+        given as 1.3333333333333333, made exact if rationalize is set
+        """
+        if not self.rationalize or expr is None:
+            return expr
+        expr, conversions = rationalize(expr, self.tolerance)
+        self.conversions.update(conversions)
+        return expr
+
+    def conversion_report(self) -> str:
+        return ''.join(
+            f'    exponent {float(value)!r} -> {exact}\n' for value, exact in self.conversions.items()
         )
 
-    def header(self):
+    def swap(self) -> dict:
+        """
+        Interchange of alpha and beta variables
+        """
+        pairs = [(self.ra, self.rb), (getattr(self, 'ga', None), getattr(self, 'gb', None))]
+        return {a: b for pair in pairs if None not in pair for a, b in (pair, pair[::-1])}
+
+    def beta_table(self, Fb: Symbol) -> DerivativeTable:
+        """
+        Derivatives of Fb, by substitution into those of Fa in spin symmetry
+        mode if Fb is Fa with alpha and beta variables interchanged
+        """
+        swap = self.swap()
+        if self.spin_symmetry and Fb is not None and Fb == self.Fa.xreplace(swap):
+            return DerivativeTable(Fb, self.cache, source=self.dFa, swap=swap)
+        return DerivativeTable(Fb, self.cache)
+
+    def header(self, name: str = None):
+        # abort() of the stubs above max_order
+        stdlib = '#include <stdlib.h>\n' if self.orders() != list(DERIVATIVE_FUNCTIONS) else ''
         return (
 f"""
 /*
@@ -64,12 +224,12 @@ f"""
 
    Derivatives in this file generated with SymPy using xcdiff by Olav Vahtras
 
-{self.info}
+{self.info}{self.conversion_report()}{self.strategy_report(name)}
 */
 
 #include <math.h>
 #include <stdio.h>
-#include "general.h"
+{stdlib}#include "general.h"
 
 #define __CVERSION__
 
@@ -92,7 +252,7 @@ f"""
             Functional {self.name_orig}Functional = {{
               "{self.name_orig}",       /* name */
               {self.name}_isgga,   /* gga-corrected */
-               3,
+               {self.deriv_order},
               {self.name}_read,
               NULL,
               {self.name}_energy,
@@ -125,3 +285,519 @@ f"""
                 """
             )
         return retstr
+
+    def gradient(self):
+        return self.derivative_code(1)
+
+    def hessian(self):
+        return self.derivative_code(2)
+
+    def third(self):
+        return self.derivative_code(3)
+
+    def fourth(self):
+        return self.derivative_code(4)
+
+    def layout(self, order: int) -> list:
+        """
+        Blocks of the derivative function of given order as (guard, groups)
+        pairs, where groups are lists of components separated by blank lines
+        """
+        raise NotImplementedError
+
+    def label(self, variables: tuple) -> str:
+        """
+        Dalton struct field of a derivative, e.g. df1010 or df10001
+        """
+        counts = [
+            variables.count(getattr(self, v, None))
+            for v in ('ra', 'rb', 'ga', 'gb', 'gab')
+        ]
+        label = 'df' + ''.join(str(c) for c in counts[:4])
+        if counts[4]:
+            label += str(counts[4])
+        return label
+
+    def components(self, table: DerivativeTable, variables: tuple, orders) -> list:
+        return [
+            Component(self.label(key), table, key)
+            for order in orders
+            for key in lattice(variables, order)
+        ]
+
+    def derivative_code(self, order: int) -> str:
+        return '\n'.join(self.derivative_lines(order)) + '\n'
+
+    def derivative_lines(self, order: int, name: str = None):
+        """
+        Lines of the derivative function of given order, each ds->df line
+        produced only when it is needed; name is a strategy to emit with
+        instead of that of the functional
+        """
+        if order not in self.orders():
+            yield from self.stub(order)
+            return
+        name = self.strategy if name is None else name
+        if name == 'auto':
+            name = self.select(order)
+        if name is None:
+            yield from self.function_lines(order, self.flags())
+        else:
+            yield from self.emit(order, name).split('\n')[:-1]
+
+    def flags(self) -> dict:
+        """
+        Emission modes of the functional
+        """
+        return {
+            'cse': self.cse,
+            'shared': self.shared,
+            'hoist_powers': self.hoist_powers,
+            'taylor': self.taylor,
+        }
+
+    def function_lines(self, order: int, flags: dict, costs: list = None):
+        """
+        Lines of the derivative function of given order in the modes of
+        flags, appending the operation counts of its lines to costs if given
+        """
+        function, struct = DERIVATIVE_FUNCTIONS[order]
+        yield from [
+            '',
+            'static void',
+            f'{self.name}_{function}({struct} *ds, real factor, const FunDensProp* dp)',
+            '{',
+        ]
+        temporaries = sympy.numbered_symbols('t')
+        layout = self.layout(order)
+        if flags['shared'] and self.intermediates()[1]:
+            yield f'  real s[{len(self.intermediates()[1])}];'
+            yield f'  {self.name}_intermediates(dp, s);'
+        with self.executor() as executor:
+            self.precompute(layout, executor, flags)
+            for block, (guard, groups) in enumerate(layout):
+                yield from guarded(guard, self.accumulate(
+                    groups, temporaries, executor, block=block, flags=flags, costs=costs
+                ))
+        yield '}'
+
+    @property
+    def deriv_order(self) -> int:
+        """
+        Highest derivative order declared to Dalton in the Functional struct
+        """
+        return 3 if self.max_order is None else self.max_order
+
+    def orders(self) -> list:
+        """
+        Orders of the derivative functions generated, up to max_order
+        """
+        return [
+            order for order in DERIVATIVE_FUNCTIONS
+            if self.max_order is None or order <= self.max_order
+        ]
+
+    def stub(self, order: int) -> list:
+        """
+        Derivative function of an order above max_order, aborting if called
+        """
+        function, struct = DERIVATIVE_FUNCTIONS[order]
+        return [
+            '',
+            'static void',
+            f'{self.name}_{function}({struct} *ds, real factor, const FunDensProp* dp)',
+            '{',
+            '  (void)ds; (void)factor; (void)dp;',
+            f'  fprintf(stderr, "{self.name_orig}: {function} derivatives not generated '
+            f'(max_order {self.max_order})\\n");',
+            '  abort();',
+            '}',
+        ]
+
+    def strategies(self, name: str = None) -> dict:
+        """
+        Emission strategy of each order, if chosen by strategy or name
+        """
+        name = self.strategy if name is None else name
+        if name is None:
+            return {}
+        if name == 'auto':
+            return {order: self.select(order) for order in self.orders()}
+        return dict.fromkeys(self.orders(), name)
+
+    def strategy_report(self, name: str = None) -> str:
+        if (self.strategy if name is None else name) != 'auto':
+            return ''
+        return strategy.report(self.estimates, self.strategies('auto'))
+
+    def select(self, order: int) -> str:
+        """
+        Cheapest strategy for the derivative function of given order, by
+        measured ns/point if benchmark is set and a C compiler is found,
+        else by estimated operation count and then by number of lines,
+        among those that can emit it
+        """
+        if order not in self.choices:
+            estimates = {
+                name: estimate for name, estimate in self.estimate(order).items()
+                if 'error' not in estimate
+            }
+            if not estimates:
+                # no strategy can emit it, raise the error of the first
+                self.emit(order, next(iter(strategy.STRATEGIES)))
+            if self.benchmark and all('time' in e for e in estimates.values()):
+                key = 'time'
+            else:
+                key = 'cost'
+            self.choices[order] = min(
+                estimates, key=lambda name: (estimates[name][key], estimates[name]['lines'])
+            )
+        return self.choices[order]
+
+    def estimate(self, order: int) -> dict:
+        """
+        Operation count and number of lines of the derivative function of
+        given order for each strategy, and its ns/point if benchmark is set;
+        the error instead for a strategy that cannot emit it
+        """
+        if order not in self.estimates:
+            estimates = {}
+            for name in strategy.STRATEGIES:
+                try:
+                    self.emit(order, name)
+                except NotImplementedError as error:
+                    # e.g. no Taylor arithmetic for Piecewise, fall back on the others
+                    estimates[name] = {'error': str(error)}
+                    continue
+                code, cost = self._emitted[order, name]
+                estimates[name] = {'cost': cost, 'lines': len(code.splitlines())}
+            if self.benchmark:
+                function, _ = DERIVATIVE_FUNCTIONS[order]
+                for name, timings in self.timings().items():
+                    if 'error' not in estimates[name]:
+                        estimates[name]['time'] = timings[function]
+            self.estimates[order] = estimates
+        return self.estimates[order]
+
+    def timings(self) -> dict:
+        """
+        Compile-and-run ns/point of the derivative functions of every order
+        for each strategy, empty without a working C compiler
+        """
+        from . import cbench  # cbench imports the functional classes
+
+        if self._timings is None:
+            orders = [DERIVATIVE_FUNCTIONS[order][0] for order in self.orders()]
+            timings = {}
+            try:
+                for name in strategy.STRATEGIES:
+                    try:
+                        code = ''.join(self.chunks(name))
+                    except NotImplementedError:
+                        continue
+                    timings[name] = cbench.run(self, repeat=1, orders=orders, code=code)
+            except (RuntimeError, OSError, subprocess.CalledProcessError):
+                timings = {}
+            self._timings = timings
+        return self._timings
+
+    def emit(self, order: int, name: str) -> str:
+        """
+        Derivative function of given order as emitted by a strategy, whose
+        operation count is kept with it
+        """
+        if (order, name) not in self._emitted:
+            flags = {**self.flags(), 'cse': False, 'shared': False, 'taylor': False}
+            flags.update(strategy.STRATEGIES[name])
+            costs = []
+            code = '\n'.join(self.function_lines(order, flags, costs)) + '\n'
+            self._emitted[order, name] = code, sum(costs)
+        return self._emitted[order, name][0]
+
+    def expansion(self, components: list, names) -> Expansion:
+        """
+        Taylor expansion behind components, in the variables they involve
+        """
+        variables = [v for v in self.variables if any(v in c.variables for c in components)]
+        order = max(len(c.variables) for c in components)
+        return Expansion(variables, order, names)
+
+    def taylor_code(self) -> str:
+        """
+        Taylor arithmetic used by the derivative functions in taylor mode
+        """
+        spaces = set()
+        for order in self.orders():
+            for _, groups in self.layout(order):
+                tables = {}
+                for group in groups:
+                    for component in group:
+                        tables.setdefault(component.table, []).append(component)
+                for members in tables.values():
+                    expansion = self.expansion(members, None)
+                    spaces.add((len(expansion.variables), expansion.order))
+        return runtime(spaces)
+
+    def intermediates(self) -> tuple:
+        """
+        Common subexpressions of the components of all orders, per block of
+        the fourth order layout, and the renaming to s[k] of those needed by
+        the first order components, i.e. shared by every derivative function
+        """
+        if self._intermediates is None:
+            temporaries = sympy.numbered_symbols('t')
+            blocks = []
+            shared = {}
+            for guard, groups in self.layout(max(self.orders())):
+                components = [component for group in groups for component in group]
+                replacements, exprs = sympy.cse(
+                    [component.expr for component in components], symbols=temporaries
+                )
+                reduced = dict(zip(components, exprs))
+                first = [reduced[c] for c in components if len(c.variables) == 1]
+                needed = closure(replacements, first)
+                for t, _ in replacements:
+                    if t in needed:
+                        shared[t] = Symbol(f's[{len(shared)}]')
+                blocks.append((guard, replacements, reduced))
+            self._intermediates = (blocks, shared)
+        return self._intermediates
+
+    def intermediates_code(self) -> str:
+        """
+        Static inline helper computing the shared intermediates s[k]
+        """
+        blocks, shared = self.intermediates()
+        if not shared:
+            return ''
+        lines = [
+            '',
+            'static inline void',
+            f'{self.name}_intermediates(const FunDensProp* dp, real* s)',
+            '{',
+        ]
+        for guard, replacements, _ in blocks:
+            body = [
+                f'{shared[t]} = {ccode(expr.xreplace(shared))};'
+                for t, expr in replacements if t in shared
+            ]
+            if body:
+                lines += guarded(guard, body)
+        lines.append('}')
+        return '\n'.join(lines) + '\n'
+
+    def batch(self):
+        return ''.join(self.batch_code(order) for order in self.orders())
+
+    def batch_code(self, order: int) -> str:
+        """
+        Derivative function of given order over arrays of n grid points,
+        component k of point i being accumulated in out[k*n + i]
+        """
+        function, _ = DERIVATIVE_FUNCTIONS[order]
+        layout = self.layout(order)
+        columns = {}
+        for _, groups in layout:
+            for group in groups:
+                for component in group:
+                    columns.setdefault(component.label, len(columns))
+        arrays = [f'const real* restrict {array(v)}' for v in self.variables]
+        lines = [
+            '',
+            f'/* out[k*n + i]: {", ".join(f"{k} {label}" for label, k in columns.items())} */',
+            'void',
+            f'{self.name}_{function}_batch(integer n, real factor, {", ".join(arrays)}, '
+            'real* restrict out)',
+            '{',
+            '  integer i;',
+            '  for (i = 0; i < n; i++) {',
+        ]
+        temporaries = sympy.numbered_symbols('t')
+
+        def target(component):
+            return f'out[{columns[component.label]}*n + i]'
+
+        with self.executor() as executor:
+            self.precompute(layout, executor, {**self.flags(), 'shared': False})
+            for guard, groups in layout:
+                indent = '        ' if guard else '     '
+                # vanishing components are dropped along with surplus blank lines
+                body = [
+                    line for line in self.accumulate(groups, temporaries, executor, target)
+                    if not line.endswith('(0)*factor;')
+                ]
+                body = [
+                    indent + line if line else line
+                    for i, line in enumerate(body)
+                    if line or 0 < i < len(body) - 1 and body[i + 1]
+                ]
+                if guard is None:
+                    lines += body
+                elif len(body) == 1:
+                    lines += [f'     if ({guard})', *body]
+                else:
+                    lines += [f'     if ({guard}) {{', *body, '        }']
+        lines += ['  }', '}']
+        return re.sub(r'dp->(\w+)', r'\1[i]', '\n'.join(lines) + '\n')
+
+    def executor(self):
+        """
+        Process pool for the independent diff/ccode jobs, if enabled
+        """
+        if self.processes:
+            return ProcessPoolExecutor(self.processes)
+        return contextlib.nullcontext()
+
+    def precompute(self, layout: list, executor, flags: dict):
+        """
+        Derivatives of the components of layout over the process pool, with
+        their C code only in expanded mode; none in taylor mode, which
+        evaluates F, or in shared mode, whose intermediates are computed
+        serially
+        """
+        if executor is None or flags['taylor'] or flags['shared']:
+            return
+        codes = not (flags['cse'] or flags['hoist_powers'])
+        compute(layout, executor, codes=codes, processes=self.processes)
+
+    def accumulate(
+            self, groups: list, temporaries, executor=None, target=None, block=None,
+            flags: dict = None, costs: list = None
+            ):
+        """
+        Accumulation lines of a block, produced one at a time, with common
+        subexpressions of all its components as leading temporaries in cse
+        mode; target maps a component to the lvalue it is added to,
+        ds->label by default.  The modes are those of flags, by default of
+        the functional; the operation counts of the lines are appended to
+        costs if given
+
+        In taylor mode F of each table is evaluated on truncated Taylor
+        numbers in the variables of its components, whose coefficients
+        yield the derivatives.
+
+        In shared mode the block index selects the intermediates of the
+        block and only the temporaries not in s[k] are computed here; with
+        hoist_powers the fractional powers are derived from leading roots
+        """
+        if target is None:
+            def target(component):
+                return f'ds->{component.label}'
+
+        if flags is None:
+            flags = self.flags()
+        components = [component for group in groups for component in group]
+        lines = []
+        if flags['shared'] and block is not None:
+            blocks, shared = self.intermediates()
+            _, replacements, reduced = blocks[block]
+            exprs = [reduced[component] for component in components]
+            needed = closure(replacements, exprs)
+            local = [(t, e.xreplace(shared)) for t, e in replacements if t in needed - set(shared)]
+            codes = ccodes([e for _, e in local], executor)
+            lines += [f'const real {t} = {code};' for (t, _), code in zip(local, codes)]
+            if lines:
+                lines.append('')
+            codes = iter(ccodes([e.xreplace(shared) for e in exprs], executor))
+        elif flags['taylor']:
+            tables = {}
+            for component in components:
+                tables.setdefault(component.table, []).append(component)
+            codes = {}
+            for table, members in tables.items():
+                expansion = self.expansion(members, temporaries)
+                with trace.span('taylor', components=len(members)):
+                    lines += expansion.program(table.expr)
+                codes.update((c, expansion.derivative(c.variables)) for c in members)
+                if costs is not None:
+                    costs.append(expansion.cost)
+            lines.append('')
+            codes = iter([codes[component] for component in components])
+        elif flags['cse'] or flags['hoist_powers']:
+            exprs = [component.expr for component in components]
+            if flags['hoist_powers']:
+                with trace.span('hoist'):
+                    roots, exprs = hoist(exprs, temporaries)
+                lines += [f'const real {r} = {code};' for r, code in roots]
+                if costs is not None:
+                    costs += [strategy.LIBM if '(' in code else 1 for _, code in roots]
+            replacements = []
+            if flags['cse']:
+                with trace.span('cse', components=len(exprs)):
+                    replacements, exprs = sympy.cse(exprs, symbols=temporaries)
+            if costs is not None:
+                costs += [strategy.flops(e) for _, e in replacements]
+                costs += map(strategy.flops, exprs)
+            codes = ccodes([e for _, e in replacements], executor)
+            lines += [f'const real {t} = {code};' for (t, _), code in zip(replacements, codes)]
+            if lines:
+                lines.append('')
+            codes = iter(ccodes(exprs, executor))
+        else:
+            codes = (component.code for component in components)
+            if costs is not None:
+                costs += [strategy.flops(component.expr) for component in components]
+
+        yield from lines
+        for i, group in enumerate(groups):
+            if i > 0:
+                yield ''
+            for component in group:
+                with trace.span(component.label, 'component', variables=str(component.variables)):
+                    code = next(codes)
+                yield f'{target(component)} += {self.prefix}({code})*factor;'
+
+
+def guarded(guard: str, body):
+    """
+    Lines of a function body block, under an if statement unless guard is
+    None, passed on as the body lines are produced
+    """
+    indent = '     ' if guard else '  '
+    body = (indent + line if line else line for line in body)
+    if guard is None:
+        yield from body
+        return
+    head = list(itertools.islice(body, 2))
+    if len(head) == 1:
+        yield f'  if ({guard})'
+        yield from head
+        return
+    yield f'  if ({guard}) {{'
+    yield from head
+    yield from body
+    yield '     }'
+
+
+def closure(replacements: list, exprs: list) -> set:
+    """
+    Temporaries of a cse that the expressions depend on, directly or
+    through other temporaries
+    """
+    needed = set().union(*(expr.free_symbols for expr in exprs))
+    for t, expr in reversed(replacements):
+        if t in needed:
+            needed |= expr.free_symbols
+    return needed & {t for t, _ in replacements}
+
+
+def array(variable: Symbol) -> str:
+    """
+    Name of the batch input array of a density variable, e.g. rhoa for dp->rhoa
+    """
+    return re.sub(r'^dp->', '', str(variable))
+
+
+def compute(layout: list, executor=None, codes=False, processes=1):
+    """
+    Fill the derivative tables behind all components of a layout, handing
+    contiguous chunks of components with shared parents to each process
+    """
+    keys = {}
+    for _, groups in layout:
+        for group in groups:
+            for component in group:
+                keys.setdefault(component.table, []).append(component.variables)
+    for table, variables in keys.items():
+        chunksize = max(1, len(variables) // (4 * processes))
+        table.compute(variables, executor, codes, chunksize)
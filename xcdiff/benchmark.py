@@ -0,0 +1,248 @@
+"""
+Generation benchmarks: time and peak memory of each emitted function
+
+    python -m xcdiff.benchmark --output baseline.json
+    python -m xcdiff.benchmark --compare baseline.json
+"""
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import sympy
+from sympy import Rational, pi
+
+from .example import ExampleFunctional
+from .func import Functional
+from .general import GeneralFunctional
+from .gga import GGAFunctional
+
+ORDERS = ('energy', 'gradient', 'hessian', 'third', 'fourth')
+
+
+def symbols():
+    return sympy.symbols(
+        "dp->rhoa, dp->rhob, dp->grada, dp->gradb, dp->gradab"
+    )
+
+
+def slater(**kwargs):
+    ra, rb, *_ = symbols()
+    PREF = -3 / 4 * (6 / pi) ** (1 / 3)
+    return Functional(
+        "Slater", ra, rb, PREF * (ra ** (4 / 3)), PREF * (rb ** (4 / 3)),
+        threshold=1e-20, **kwargs
+    )
+
+
+def example2(**kwargs):
+    ra, rb, ga, gb, _ = symbols()
+    return ExampleFunctional(
+        "Example2", ra, rb, ga, gb, ra * ga * ga, rb * gb * gb,
+        const="static const real EPREF= -5e-5;", threshold=1e-20, **kwargs
+    )
+
+
+def example3(**kwargs):
+    ra, rb, ga, gb, _ = symbols()
+    return ExampleFunctional(
+        "Example3", ra, rb, ga, gb, pow(ga, 1.7), pow(gb, 1.7),
+        const="static const real EPREF= -5e-2;", threshold=1e-20, **kwargs
+    )
+
+
+def example2x(**kwargs):
+    ra, rb, ga, gb, gab = symbols()
+    return GeneralFunctional(
+        "Example2x", ra, rb, ga, gb, gab, ra*rb*(ga*ga + gb*gb + 2*gab), **kwargs
+    )
+
+
+def b88(**kwargs):
+    """
+    Becke 88 exchange
+    """
+    ra, rb, ga, gb, _ = symbols()
+    beta = Rational(42, 10000)
+    cx = Rational(3, 2) * (Rational(3, 4) / pi) ** Rational(1, 3)
+
+    def spin(r, g):
+        x = g / r**Rational(4, 3)
+        return -r**Rational(4, 3) * (cx + beta * x**2 / (1 + 6 * beta * x * sympy.asinh(x)))
+
+    return GGAFunctional("B88", ra, rb, ga, gb, spin(ra, ga), spin(rb, gb), **kwargs)
+
+
+def pbex(**kwargs):
+    """
+    PBE exchange, spin scaled
+    """
+    ra, rb, ga, gb, _ = symbols()
+    kappa, mu = Rational(804, 1000), Rational(2195149727645171, 10**16)
+
+    def spin(r, g):
+        s = g / ((3 * pi**2) ** Rational(1, 3) * (2 * r) ** Rational(4, 3))
+        Fx = 1 + kappa - kappa / (1 + mu * s**2 / kappa)
+        return -Rational(3, 8) * (3 / pi) ** Rational(1, 3) * (2 * r) ** Rational(4, 3) * Fx
+
+    return GGAFunctional("PBEx", ra, rb, ga, gb, spin(ra, ga), spin(rb, gb), **kwargs)
+
+
+def lyp(**kwargs):
+    """
+    Lee-Yang-Parr correlation in the form of Miehlich et al.
+    """
+    ra, rb, ga, gb, gab = symbols()
+    a, b = Rational(4918, 100000), Rational(132, 1000)
+    c, d = Rational(2533, 10000), Rational(349, 1000)
+    CF = Rational(3, 10) * (3 * pi**2) ** Rational(2, 3)
+    r = ra + rb
+    rm13 = r ** Rational(-1, 3)
+    omega = sympy.exp(-c * rm13) / (1 + d * rm13) * r ** Rational(-11, 3)
+    delta = c * rm13 + d * rm13 / (1 + d * rm13)
+    gaa, gbb = ga**2, gb**2
+    grad2 = gaa + gbb + 2 * gab
+    F = (
+        -a * 4 / (1 + d * rm13) * ra * rb / r
+        - a * b * omega * (
+            ra * rb * (
+                2**Rational(11, 3) * CF * (ra**Rational(8, 3) + rb**Rational(8, 3))
+                + (Rational(47, 18) - 7 * delta / 18) * grad2
+                - (Rational(5, 2) - delta / 18) * (gaa + gbb)
+                - (delta - 11) / 9 * (ra / r * gaa + rb / r * gbb)
+            )
+            - Rational(2, 3) * r**2 * grad2
+            + (Rational(2, 3) * r**2 - ra**2) * gbb
+            + (Rational(2, 3) * r**2 - rb**2) * gaa
+        )
+    )
+    return GeneralFunctional("LYP", ra, rb, ga, gb, gab, F, **kwargs)
+
+
+FUNCTIONALS = {
+    'slater': slater,
+    'example2': example2,
+    'example3': example3,
+    'example2x': example2x,
+    'b88': b88,
+    'pbex': pbex,
+    'lyp': lyp,
+}
+
+
+def measure(factory, order: str, **kwargs) -> dict:
+    """
+    Wall time and peak traced memory of one emitter on a fresh functional
+    with a cold SymPy cache
+    """
+    functional = factory(**kwargs)
+    sympy.core.cache.clear_cache()
+    tracemalloc.start()
+    start = time.perf_counter()
+    getattr(functional, order)()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'time': elapsed, 'peak': peak}
+
+
+def run(names=None, orders=ORDERS, repeat: int = 1, **kwargs) -> dict:
+    results = {}
+    for name in names or FUNCTIONALS:
+        results[name] = {}
+        for order in orders:
+            runs = [measure(FUNCTIONALS[name], order, **kwargs) for _ in range(repeat)]
+            results[name][order] = {
+                'time': min(r['time'] for r in runs),
+                'peak': max(r['peak'] for r in runs),
+            }
+    return {'meta': metadata(), 'results': results}
+
+
+def metadata() -> dict:
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'python': platform.python_version(),
+        'sympy': sympy.__version__,
+        'machine': platform.machine(),
+    }
+
+
+def compare(baseline: dict, current: dict, tolerance: float = 0.1) -> list:
+    """
+    Rows of (functional, order, baseline time, current time, ratio,
+    regressed) for all measurements present in both runs
+    """
+    rows = []
+    for name, orders in current['results'].items():
+        for order, result in orders.items():
+            try:
+                before = baseline['results'][name][order]['time']
+            except KeyError:
+                continue
+            ratio = result['time'] / before if before else float('inf')
+            rows.append((name, order, before, result['time'], ratio, ratio > 1 + tolerance))
+    return rows
+
+
+def report(results: dict) -> str:
+    lines = [f"{'functional':12} {'order':10} {'time/s':>10} {'peak/kB':>10}"]
+    for name, orders in results['results'].items():
+        for order, result in orders.items():
+            lines.append(
+                f"{name:12} {order:10} {result['time']:10.4f} {result['peak'] / 1024:10.1f}"
+            )
+    return '\n'.join(lines)
+
+
+def report_comparison(rows: list) -> str:
+    lines = [f"{'functional':12} {'order':10} {'before/s':>10} {'after/s':>10} {'ratio':>7}"]
+    for name, order, before, after, ratio, regressed in rows:
+        flag = '  REGRESSION' if regressed else ''
+        lines.append(
+            f"{name:12} {order:10} {before:10.4f} {after:10.4f} {ratio:7.2f}{flag}"
+        )
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m xcdiff.benchmark', description=__doc__.strip())
+    parser.add_argument('--only', nargs='+', choices=FUNCTIONALS, help='functionals to run')
+    parser.add_argument('--orders', nargs='+', choices=ORDERS, default=ORDERS)
+    parser.add_argument('--repeat', type=int, default=1, help='best of n runs')
+    parser.add_argument('--output', help='save results as JSON')
+    parser.add_argument('--compare', help='JSON baseline to compare with')
+    parser.add_argument('--tolerance', type=float, default=0.1, help='allowed slowdown')
+    parser.add_argument('--cse', action='store_true')
+    parser.add_argument('--processes', type=int)
+    args = parser.parse_args(argv)
+
+    results = run(
+        args.only, args.orders, args.repeat, cse=args.cse, processes=args.processes
+    )
+    print(report(results))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            rows = compare(json.load(f), results, args.tolerance)
+        print()
+        print(report_comparison(rows))
+        if any(row[-1] for row in rows):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,78 @@
+import hashlib
+import json
+import os
+import pathlib
+import tempfile
+
+import sympy
+from sympy import Symbol, srepr
+
+
+class DiskCache:
+    """
+    Content addressed on-disk store of derivatives and their C code
+
+    Entries are keyed by a hash of the SymPy version, srepr(F) and the
+    differentiation variables; the least recently used entries are evicted
+    when the total size exceeds max_size bytes.  Derivatives are stored
+    pickled, so a cache directory must be as trusted as the code itself
+    """
+
+    def __init__(self, directory, max_size: int = 256 * 2**20):
+        self.directory = pathlib.Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_size = max_size
+        self.size = sum(path.stat().st_size for path in self.entries())
+
+    def entries(self):
+        return self.directory.glob('*/*.json')
+
+    @staticmethod
+    def hasher(expr: Symbol):
+        """
+        Hash state of an expression, to be completed by digest
+        """
+        return hashlib.sha256(f'{sympy.__version__}\0{srepr(expr)}'.encode())
+
+    @staticmethod
+    def digest(hasher, variables: tuple) -> str:
+        hasher = hasher.copy()
+        hasher.update(b'\0' + srepr(variables).encode())
+        return hasher.hexdigest()
+
+    def path(self, digest: str) -> pathlib.Path:
+        return self.directory / digest[:2] / f'{digest}.json'
+
+    def load(self, digest: str) -> dict:
+        path = self.path(digest)
+        try:
+            with open(path) as f:
+                entry = json.load(f)
+            os.utime(path)
+        except (OSError, ValueError):
+            return {}
+        return entry
+
+    def save(self, digest: str, **fields):
+        entry = {**self.load(digest), **fields}
+        path = self.path(digest)
+        path.parent.mkdir(exist_ok=True)
+        old_size = path.stat().st_size if path.exists() else 0
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(entry, f)
+        os.replace(tmp, path)
+        self.size += path.stat().st_size - old_size
+        if self.size > self.max_size:
+            self.evict()
+
+    def evict(self):
+        """
+        Remove least recently used entries until within max_size
+        """
+        paths = sorted(self.entries(), key=lambda path: path.stat().st_mtime)
+        for path in paths:
+            if self.size <= self.max_size:
+                break
+            self.size -= path.stat().st_size
+            path.unlink()
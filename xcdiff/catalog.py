@@ -0,0 +1,223 @@
+"""
+Generation of a library of functionals from a JSON catalog
+
+    python -m xcdiff catalog.json --output-dir dalton/DFT --jobs 8
+
+A catalog is a list of entries such as
+
+    {
+        "name": "Slater",
+        "class": "Functional",
+        "definitions": {"PREF": "-3/4*(6/pi)**(1/3)"},
+        "Fa": "PREF*rhoa**(4/3)",
+        "Fb": "PREF*rhob**(4/3)",
+        "threshold": 1e-20,
+        "options": {"cse": true}
+    }
+
+with expressions in rhoa, rhob, grada, gradb and gradab; Functional,
+GGAFunctional and ExampleFunctional take Fa and Fb, GeneralFunctional
+takes F. const and info are copied to the generated file, options are
+passed on as keyword arguments
+
+The digest of each generated file is kept in manifest.json in the output
+directory; functionals whose inputs, template version and xcdiff version
+are unchanged are skipped and their files left untouched
+"""
+import argparse
+import json
+import os
+import pathlib
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import sympy
+
+from .example import ExampleFunctional
+from .func import Functional
+from .general import GeneralFunctional
+from .gga import GGAFunctional
+
+MANIFEST = 'manifest.json'
+
+VARIABLES = ('rhoa', 'rhob', 'grada', 'gradb', 'gradab')
+
+CLASSES = {
+    'Functional': (Functional, VARIABLES[:2], ('Fa', 'Fb')),
+    'GGAFunctional': (GGAFunctional, VARIABLES[:4], ('Fa', 'Fb')),
+    'ExampleFunctional': (ExampleFunctional, VARIABLES[:4], ('Fa', 'Fb')),
+    'GeneralFunctional': (GeneralFunctional, VARIABLES, ('F',)),
+}
+
+
+def load(path) -> list:
+    """
+    Entries of a catalog file, checked for a name, a known class and the
+    expressions the class takes
+    """
+    with open(path) as f:
+        entries = json.load(f)
+    names = set()
+    for entry in entries:
+        name = entry.get('name')
+        if not name:
+            raise ValueError(f'{path}: entry without a name')
+        if name.lower() in names:
+            raise ValueError(f'{path}: duplicate functional {name}')
+        names.add(name.lower())
+        if entry.get('class') not in CLASSES:
+            raise ValueError(f'{path}: {name} has unknown class {entry.get("class")}')
+        missing = [e for e in CLASSES[entry['class']][2] if e not in entry]
+        if missing:
+            raise ValueError(f'{path}: {name} lacks {", ".join(missing)}')
+    return entries
+
+
+def build(entry: dict):
+    """
+    Functional of a catalog entry
+    """
+    cls, variables, exprs = CLASSES[entry['class']]
+    namespace = {v: sympy.Symbol(f'dp->{v}') for v in VARIABLES}
+    for name, definition in entry.get('definitions', {}).items():
+        namespace[name] = sympy.sympify(definition, locals=namespace)
+    kwargs = {key: entry[key] for key in ('const', 'threshold', 'info') if key in entry}
+    kwargs.update(entry.get('options', {}))
+    return cls(
+        entry['name'],
+        *(namespace[v] for v in variables),
+        *(sympy.sympify(entry[e], locals=namespace) for e in exprs),
+        **kwargs
+    )
+
+
+def generate(entry: dict, directory, manifest: dict = None) -> dict:
+    """
+    Write fun-<name>.c of an entry to directory unless its digest is in
+    manifest, returning the path, digest and time taken, or the traceback
+    of a failure
+    """
+    start = time.perf_counter()
+    result = {'name': entry['name']}
+    try:
+        functional = build(entry)
+        path = pathlib.Path(directory) / f'fun-{functional.name}.c'
+        result['path'] = str(path)
+        result['digest'] = functional.digest()
+        if path.exists() and (manifest or {}).get(path.name) == result['digest']:
+            result['skipped'] = True
+        else:
+            code = str(functional)
+            if not path.exists() or path.read_text() != code:
+                path.write_text(code)
+    except Exception:
+        result['error'] = traceback.format_exc()
+    result['time'] = time.perf_counter() - start
+    return result
+
+
+def run(entries: list, directory, jobs: int = None, progress=None, force=False) -> list:
+    """
+    Generate all entries in jobs worker processes, or in this process if
+    jobs is 1, calling progress(done, total, result) as each completes;
+    entries unchanged since the last run are skipped unless force, and
+    results are returned in catalog order after updating the manifest
+    """
+    manifest = {} if force else read_manifest(directory)
+    results = {}
+    if jobs == 1:
+        for entry in entries:
+            results[entry['name']] = generate(entry, directory, manifest)
+            if progress is not None:
+                progress(len(results), len(entries), results[entry['name']])
+    else:
+        with ProcessPoolExecutor(jobs) as executor:
+            futures = [executor.submit(generate, entry, directory, manifest) for entry in entries]
+            for future in as_completed(futures):
+                result = future.result()
+                results[result['name']] = result
+                if progress is not None:
+                    progress(len(results), len(entries), result)
+    results = [results[entry['name']] for entry in entries]
+    write_manifest(directory, results)
+    return results
+
+
+def read_manifest(directory) -> dict:
+    path = pathlib.Path(directory) / MANIFEST
+    if not path.exists():
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def write_manifest(directory, results: list):
+    """
+    Record the digests of the files generated or skipped, dropping those
+    that failed so that they are retried
+    """
+    manifest = read_manifest(directory)
+    for result in results:
+        if 'error' in result:
+            if 'path' in result:
+                manifest.pop(pathlib.Path(result['path']).name, None)
+        else:
+            manifest[pathlib.Path(result['path']).name] = result['digest']
+    path = pathlib.Path(directory) / MANIFEST
+    with open(path, 'w') as f:
+        json.dump(dict(sorted(manifest.items())), f, indent=2)
+        f.write('\n')
+
+
+def line(done: int, total: int, result: dict) -> str:
+    if 'error' in result:
+        status = 'FAILED'
+    elif result.get('skipped'):
+        status = 'unchanged'
+    else:
+        status = result['path']
+    return f"[{done}/{total}] {result['name']} {result['time']:.2f} s {status}"
+
+
+def report(results: list) -> str:
+    lines = [f"{'functional':20} {'time/s':>10}"]
+    lines += [
+        f"{r['name']:20} {r['time']:10.2f}"
+        + ('  FAILED' if 'error' in r else '  unchanged' if r.get('skipped') else '')
+        for r in results
+    ]
+    failures = [r for r in results if 'error' in r]
+    skipped = [r for r in results if r.get('skipped')]
+    lines.append(
+        f'{len(results) - len(failures) - len(skipped)} generated, '
+        f'{len(skipped)} unchanged, {len(failures)} failed'
+    )
+    for r in failures:
+        lines += ['', f"{r['name']}:", r['error'].rstrip()]
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m xcdiff', description=__doc__.strip(),
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('catalog', help='JSON catalog of functionals')
+    parser.add_argument('--output-dir', default='.', help='directory of the fun-*.c files')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count(), help='worker processes')
+    parser.add_argument('--only', nargs='+', help='names of the functionals to generate')
+    parser.add_argument('--force', action='store_true', help='regenerate unchanged functionals')
+    args = parser.parse_args(argv)
+
+    entries = load(args.catalog)
+    if args.only:
+        only = {name.lower() for name in args.only}
+        entries = [entry for entry in entries if entry['name'].lower() in only]
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    def progress(done, total, result):
+        print(line(done, total, result), file=sys.stderr, flush=True)
+
+    results = run(entries, args.output_dir, args.jobs, progress, args.force)
+    print(report(results))
+    return 1 if any('error' in r for r in results) else 0
@@ -0,0 +1,224 @@
+"""
+Compile-and-run timings of the emitted C code with stand-in Dalton headers
+
+    python -m xcdiff.cbench --only slater b88 --points 100000
+    python -m xcdiff.cbench --cflags="-O3 -march=native"
+"""
+import argparse
+import os
+import pathlib
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from .base import DERIVATIVE_FUNCTIONS
+from .benchmark import FUNCTIONALS
+from .derivatives import lattice
+
+ORDERS = ('energy', 'first', 'second', 'third', 'fourth')
+
+VARIABLES = ('rhoa', 'rhob', 'grada', 'gradb', 'gradab')
+
+GENERAL_H = """\
+#ifndef GENERAL_H
+#define GENERAL_H
+typedef double real;
+typedef int integer;
+#endif
+"""
+
+DRIVER_C = """\
+#include <stdlib.h>
+#include <string.h>
+#include <time.h>
+
+#include "fun-{name}.c"
+
+static double
+seconds(void)
+{{
+    struct timespec t;
+    clock_gettime(CLOCK_MONOTONIC, &t);
+    return t.tv_sec + 1e-9*t.tv_nsec;
+}}
+
+#define TIME(label, call) \\
+    do {{ \\
+        double best = 1e300; \\
+        for (int r = 0; r < repeat; r++) {{ \\
+            double start = seconds(); \\
+            for (int i = 0; i < n; i++) {{ call; }} \\
+            double elapsed = seconds() - start; \\
+            if (elapsed < best) best = elapsed; \\
+        }} \\
+        printf("%s %.6g\\n", label, 1e9*best/n); \\
+    }} while (0)
+
+int
+main(int argc, char** argv)
+{{
+    int n = atoi(argv[1]), repeat = atoi(argv[2]);
+    FunDensProp* dp = malloc(n*sizeof(FunDensProp));
+    unsigned long long state = 12345;
+    for (int i = 0; i < n; i++) {{
+        real u[5];
+        for (int k = 0; k < 5; k++) {{
+            state = state*6364136223846793005ULL + 1442695040888963407ULL;
+            u[k] = (state >> 11)*(1.0/9007199254740992.0);
+        }}
+        dp[i].rhoa = exp(-7 + 9*u[0]);
+        dp[i].rhob = exp(-7 + 9*u[1]);
+        dp[i].grada = exp(-7 + 9*u[2]);
+        dp[i].gradb = exp(-7 + 9*u[3]);
+        dp[i].gradab = (2*u[4] - 1)*dp[i].grada*dp[i].gradb;
+    }}
+    volatile real sink = 0;
+    static FunFirstFuncDrv d1;
+    static FunSecondFuncDrv d2;
+    static FunThirdFuncDrv d3;
+    static FunFourthFuncDrv d4;
+{calls}
+    sink += d1.df1000 + d2.df1000 + d3.df1000 + d4.df1000;
+    free(dp);
+    return 0;
+}}
+"""
+
+CALLS = {
+    'energy': 'TIME("energy", sink += {name}_energy(dp + i));',
+    'first': 'TIME("first", {name}_first(&d1, 1.0, dp + i));',
+    'second': 'TIME("second", {name}_second(&d2, 1.0, dp + i));',
+    'third': 'TIME("third", {name}_third(&d3, 1.0, dp + i));',
+    'fourth': 'TIME("fourth", {name}_fourth(&d4, 1.0, dp + i));',
+}
+
+
+def label(key: tuple) -> str:
+    """
+    Dalton struct field of a derivative in all five density variables
+    """
+    counts = [key.count(v) for v in VARIABLES]
+    return 'df' + ''.join(str(c) for c in counts[:4]) + (str(counts[4]) if counts[4] else '')
+
+
+def functionals_h() -> str:
+    """
+    Stand-in functionals.h: FunDensProp, the Functional struct and the
+    derivative structs with every df field up to their order
+    """
+    lines = [
+        '#ifndef FUNCTIONALS_H',
+        '#define FUNCTIONALS_H',
+        '#include "general.h"',
+        '',
+        'typedef struct { real rhoa, rhob, grada, gradb, gradab; } FunDensProp;',
+        '',
+    ]
+    for order, (_, struct) in DERIVATIVE_FUNCTIONS.items():
+        fields = dict.fromkeys(
+            label(key) for n in range(1, order + 1) for key in lattice(VARIABLES, n)
+        )
+        lines += [
+            'typedef struct {',
+            *(f'    real {field};' for field in fields),
+            f'}} {struct};',
+            '',
+        ]
+    lines += [
+        'typedef struct {',
+        '    const char* name;',
+        '    integer (*is_gga)(void);',
+        '    int deriv_order;',
+        '    integer (*read)(const char* conf_line);',
+        '    void (*report)(void);',
+        '    real (*func)(const FunDensProp* dp);',
+        '    void (*first)(FunFirstFuncDrv* ds, real factor, const FunDensProp* dp);',
+        '    void (*second)(FunSecondFuncDrv* ds, real factor, const FunDensProp* dp);',
+        '    void (*third)(FunThirdFuncDrv* ds, real factor, const FunDensProp* dp);',
+        '    void (*fourth)(FunFourthFuncDrv* ds, real factor, const FunDensProp* dp);',
+        '} Functional;',
+        '',
+        'static void fun_set_hf_weight(real w) { (void)w; }',
+        '#endif',
+    ]
+    return '\n'.join(lines) + '\n'
+
+
+def compiler() -> str:
+    cc = os.environ.get('CC', 'cc')
+    if shutil.which(cc) is None:
+        raise RuntimeError(f'C compiler {cc} not found, set CC')
+    return cc
+
+
+def build(functional, directory, orders=ORDERS, flags=('-O2',), code: str = None) -> pathlib.Path:
+    """
+    Write str(functional), or code if given, the stand-in headers and a
+    timing driver to directory and compile them, returning the executable
+    """
+    directory = pathlib.Path(directory)
+    name = functional.name
+    (directory / 'general.h').write_text(GENERAL_H)
+    (directory / 'functionals.h').write_text(functionals_h())
+    (directory / f'fun-{name}.c').write_text(str(functional) if code is None else code)
+    calls = '\n'.join('    ' + CALLS[order].format(name=name) for order in orders)
+    (directory / 'driver.c').write_text(DRIVER_C.format(name=name, calls=calls))
+    executable = directory / 'driver'
+    result = subprocess.run(
+        [compiler(), '-std=gnu99', *flags, '-I', str(directory), '-o', str(executable),
+         str(directory / 'driver.c'), '-lm'],
+        capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f'compilation of fun-{name}.c failed:\n{result.stderr}')
+    return executable
+
+
+def run(
+        functional, points: int = 10**5, repeat: int = 3, orders=ORDERS, flags=('-O2',),
+        code: str = None
+        ) -> dict:
+    """
+    Best of repeat timings in ns/point of each order over a synthetic grid,
+    of the code of the functional or the given code
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        executable = build(functional, directory, orders, flags, code)
+        output = subprocess.run(
+            [str(executable), str(points), str(repeat)],
+            check=True, capture_output=True, text=True
+        ).stdout
+    return {order: float(ns) for order, ns in (line.split() for line in output.splitlines())}
+
+
+def report(results: dict) -> str:
+    lines = [f"{'functional':12} " + ' '.join(f'{order:>10}' for order in ORDERS)]
+    for name, timings in results.items():
+        cells = [f'{timings[order]:10.1f}' if order in timings else ' ' * 10 for order in ORDERS]
+        lines.append(f'{name:12} ' + ' '.join(cells))
+    lines.append('(ns/point)')
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m xcdiff.cbench', description=__doc__.strip())
+    parser.add_argument('--only', nargs='+', choices=FUNCTIONALS, help='functionals to run')
+    parser.add_argument('--orders', nargs='+', choices=ORDERS, default=ORDERS)
+    parser.add_argument('--points', type=int, default=10**5)
+    parser.add_argument('--repeat', type=int, default=3, help='best of n runs')
+    parser.add_argument('--cflags', default='-O2', help='compiler flags, e.g. "-O3 -march=native"')
+    parser.add_argument('--cse', action='store_true')
+    args = parser.parse_args(argv)
+
+    flags = args.cflags.split()
+    results = {
+        name: run(FUNCTIONALS[name](cse=args.cse), args.points, args.repeat, args.orders, flags)
+        for name in args.only or FUNCTIONALS
+    }
+    print(report(results))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
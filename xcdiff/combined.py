@@ -0,0 +1,144 @@
+import textwrap
+
+import sympy
+from sympy import Symbol
+
+from .derivatives import DerivativeTable
+from .example import ExampleFunctional
+from .general import GeneralFunctional
+from .printer import ccode
+
+DENSITIES = {
+    'ra': 'dp->rhoa',
+    'rb': 'dp->rhob',
+    'ga': 'dp->grada',
+    'gb': 'dp->gradb',
+    'gab': 'dp->gradab',
+}
+
+
+class CombinedFunctional(GeneralFunctional):
+    """
+    Weighted sum of functionals, e.g. 0.8*Slater + 0.2*B88, as one
+    functional: the sum is differentiated once and, as cse is on by
+    default, subexpressions such as the powers of rhoa common to the terms
+    are computed once per point
+
+    The terms are (weight, functional) pairs in the same density symbols.
+    LDA terms with a density threshold are summed apart, into Fla and Flb,
+    and guarded by the threshold of the sum, by default the largest of
+    theirs, as in Functional.layout; those of combined terms too.  A sum
+    of LDA terms only is an LDA functional
+    """
+
+    def __init__(self, name: str, terms: list, **kwargs):
+        terms = list(terms)
+        self.terms = [(sympy.sympify(weight), functional) for weight, functional in terms]
+        if not self.terms:
+            raise ValueError(f'{name}: no terms to combine')
+        for _, functional in self.terms:
+            if isinstance(functional, ExampleFunctional):
+                raise TypeError(
+                    f'{name}: cannot combine {functional.name_orig}, its prefix is not part of F'
+                )
+        ra, rb, ga, gb, gab = (self.variable(a, default) for a, default in DENSITIES.items())
+        leaves = list(flatten(self.terms))
+        lda = [(weight, functional) for weight, functional in leaves if is_guarded(functional)]
+        rest = sympy.Add(*(
+            weight * spin_summed(functional) for weight, functional in leaves
+            if not is_guarded(functional)
+        ))
+        if lda and kwargs.get('threshold') is None:
+            kwargs['threshold'] = max(functional.threshold for _, functional in lda)
+        kwargs.setdefault('cse', True)
+        kwargs.setdefault('const', '\n'.join(dict.fromkeys(
+            functional.const for _, functional in self.terms if functional.const
+        )))
+        kwargs.setdefault('info', '    ' + ' + '.join(
+            f'{weight}*{functional.name_orig}' for weight, functional in terms
+        ) + '\n')
+        super().__init__(name, ra, rb, ga, gb, gab, rest, **kwargs)
+        self.Frest = self.F
+        self.Fla = self.normalize(sympy.Add(*(weight * functional.Fa for weight, functional in lda)))
+        self.Flb = self.normalize(sympy.Add(*(weight * functional.Fb for weight, functional in lda)))
+        self.dFla = DerivativeTable(self.Fla, self.cache)
+        self.dFlb = DerivativeTable(self.Flb, self.cache)
+        self.guarded = bool(lda)
+        self.F = self.Frest + self.Fla + self.Flb
+        # a sum of LDA functionals needs no density gradients
+        self.gga = int(any(functional.gga for _, functional in self.terms))
+
+    def energy(self):
+        if not self.guarded:
+            return super().energy()
+        threshold = f'{self.name.upper()}_THRESHOLD'
+        code = textwrap.dedent(
+            f"""
+            {self.const}
+            static real
+            {self.name}_energy(const FunDensProp* dp)
+            {{
+              real e = {ccode(self.Frest)};
+              if (dp->rhoa >{threshold})
+                  e += {ccode(self.Fla)};
+              if (dp->rhob >{threshold})
+                  e += {ccode(self.Flb)};
+              return e;
+            }}
+            """
+        )
+        return code
+
+    def layout(self, order):
+        if not self.guarded:
+            return super().layout(order)
+        # the unguarded terms, unless all are guarded LDA terms
+        layout = super().layout(order) if self.Frest != 0 else []
+        threshold = f'{self.name.upper()}_THRESHOLD'
+        orders = range(1, order + 1)
+        return layout + [
+            (f'dp->rhoa>{threshold}', [self.components(self.dFla, (self.ra,), orders)]),
+            (f'dp->rhob>{threshold}', [self.components(self.dFlb, (self.rb,), orders)]),
+        ]
+
+    def variable(self, attribute: str, default: str) -> Symbol:
+        """
+        Density symbol shared by the terms, or the default if no term has it
+        """
+        symbols = {
+            getattr(functional, attribute) for _, functional in self.terms
+            if getattr(functional, attribute, None) is not None
+        }
+        if len(symbols) > 1:
+            raise ValueError(f'terms differ in {attribute}: {", ".join(map(str, symbols))}')
+        return symbols.pop() if symbols else Symbol(default)
+
+
+def flatten(terms: list):
+    """
+    Weighted terms with those of combined terms in their place, so that
+    their LDA terms keep their guards
+    """
+    for weight, functional in terms:
+        if isinstance(functional, CombinedFunctional):
+            yield from ((weight * w, f) for w, f in flatten(functional.terms))
+        else:
+            yield weight, functional
+
+
+def is_guarded(functional) -> bool:
+    """
+    Whether functional is an LDA functional with a density threshold
+    """
+    if isinstance(functional, GeneralFunctional):
+        return False
+    return not functional.gga and bool(functional.threshold)
+
+
+def spin_summed(functional) -> Symbol:
+    """
+    Expression of the energy density of a functional
+    """
+    if isinstance(functional, GeneralFunctional):
+        return functional.F
+    return functional.Fa + functional.Fb
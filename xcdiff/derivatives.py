@@ -0,0 +1,286 @@
+import base64
+import itertools
+import pickle
+
+from sympy import S, Symbol, default_sort_key, evaluate
+
+from . import trace
+from .printer import ccode
+
+
+class DerivativeTable:
+    """
+    Derivatives of one expression, keyed by the multiset of
+    differentiation variables and computed at most once
+
+    A derivative is obtained by differentiating its stored lower order
+    parent once, so the cost grows with the number of components rather
+    than with order times components.  The trailing run of a repeated
+    variable is taken in one step, as SymPy does for an n-th derivative,
+    so that Float coefficients round exactly as in F.diff(...)
+
+    With a swap of alpha and beta variables, derivatives are obtained by
+    substitution into those of the source table, expr being the swapped
+    source expression; without a source expr itself is symmetric and only
+    one of each pair of mirror image derivatives is differentiated
+    """
+
+    def __init__(self, expr: Symbol, cache=None, source=None, swap=None):
+        self.expr = expr
+        self.cache = cache
+        self.source = self if source is None else source
+        self.swap = swap
+        self._derivatives = {(): expr}
+        self._codes = {}
+        if cache is not None:
+            self._hasher = cache.hasher(expr)
+
+    @staticmethod
+    def key(variables) -> tuple:
+        if isinstance(variables, Symbol):
+            variables = (variables,)
+        return tuple(sorted(variables, key=default_sort_key))
+
+    def __getitem__(self, variables) -> Symbol:
+        key = self.key(variables)
+        if key in self._derivatives:
+            return self._derivatives[key]
+        image = self.image(key)
+        if image is not None:
+            expr = self.source[image].xreplace(self.swap)
+            return self._derivatives.setdefault(key, expr)
+        if not self.vanishes(key) and not self._load(key):
+            parent, variable, count = self.parent(key)
+            self[parent]
+            if not self.vanishes(key):
+                self._store(key, differentiate(self[parent], variable, count))
+        return self._derivatives.setdefault(key, S.Zero)
+
+    def image(self, key: tuple):
+        """
+        Key in the source table of a derivative obtained by substitution
+        """
+        if self.swap is None:
+            return None
+        image = self.key(self.swap.get(variable, variable) for variable in key)
+        if self.source is not self:
+            return image
+        if default_sort_key(image) < default_sort_key(key):
+            return image
+        return None
+
+    def vanishes(self, variables) -> bool:
+        """
+        Whether a derivative is zero because a computed lower derivative
+        does not depend on the remaining variables, checked before any
+        diff or ccode is run
+        """
+        key = self.key(variables)
+        for i in reversed(range(len(key))):
+            if key[:i] in self._derivatives:
+                free_symbols = self._derivatives[key[:i]].free_symbols
+                if any(variable not in free_symbols for variable in key[i:]):
+                    return True
+        return False
+
+    def code(self, variables) -> str:
+        """
+        C code of a derivative, as printed by ccode
+        """
+        key = self.key(variables)
+        if key not in self._codes and not self._load_code(key):
+            expr = self[key]
+            with trace.span('ccode', key=str(key)):
+                self._store_code(key, ccode(expr))
+        return self._codes[key]
+
+    def drop_codes(self):
+        """
+        Forget the C code printed so far, printed again or read from the
+        disk cache when next needed
+        """
+        self._codes.clear()
+
+    @staticmethod
+    def parent(key: tuple) -> tuple:
+        variable = key[-1]
+        count = key.count(variable)
+        return key[:-count], variable, count
+
+    def compute(self, keys, executor=None, codes=False, chunksize=1):
+        """
+        Compute derivatives, or only the C code of derivatives, of given keys
+
+        Without codes the independent diff calls of each level of missing
+        derivatives are mapped over executor.  The C code jobs are mapped
+        over executor as a whole; each worker process fills its own copy of
+        the table by the serial algorithm.  In both cases the results are
+        identical to those of the serial path
+        """
+        keys = list(dict.fromkeys(self.key(key) for key in keys))
+        if not codes:
+            if executor is not None:
+                self.differentiate(keys, executor)
+            for key in keys:
+                self[key]
+            return
+
+        keys = [
+            key for key in keys
+            if key not in self._codes and not self._load_code(key)
+        ]
+        if executor is None:
+            for key in keys:
+                self.code(key)
+            return
+
+        data = pickle.dumps(self)
+        results = executor.map(_code, itertools.repeat(data), keys, chunksize=chunksize)
+        for key, code in zip(keys, results):
+            self._store_code(key, code)
+
+    def differentiate(self, keys, executor):
+        """
+        Differentiate the missing derivatives of keys and their parents
+        level by level, mapping the diff calls of each level over executor
+        """
+        pending = set()
+        for key in keys:
+            while key not in self._derivatives and key not in pending:
+                image = self.image(key)
+                if image is None:
+                    pending.add(key)
+                    key = self.parent(key)[0]
+                elif self.source is self:
+                    key = image
+                else:
+                    break
+
+        for length in sorted({len(key) for key in pending}):
+            jobs = []
+            for key in sorted(pending, key=default_sort_key):
+                if len(key) != length:
+                    continue
+                if self.vanishes(key) or self._load(key):
+                    self[key]
+                else:
+                    jobs.append(key)
+            parents = [self.parent(key) for key in jobs]
+            results = executor.map(
+                _differentiate,
+                [pickle.dumps(self[parent]) for parent, _, _ in parents],
+                [variable for _, variable, _ in parents],
+                [count for _, _, count in parents],
+            )
+            for key, data in zip(jobs, results):
+                self._store(key, loads(data))
+
+    def __getstate__(self):
+        return {
+            'expr': self.expr,
+            'source': None if self.source is self else self.source,
+            'swap': self.swap,
+        }
+
+    def __setstate__(self, state):
+        self.__init__(state['expr'], None, state['source'], state['swap'])
+
+    def _digest(self, key: tuple) -> str:
+        return self.cache.digest(self._hasher, key)
+
+    def _load(self, key: tuple) -> bool:
+        """
+        Look up a derivative in the disk cache
+        """
+        if self.cache is None:
+            return False
+        entry = self.cache.load(self._digest(key))
+        if 'expr' not in entry:
+            return False
+        self._derivatives[key] = loads(base64.b64decode(entry['expr']))
+        return True
+
+    def _load_code(self, key: tuple) -> bool:
+        """
+        Look up the C code of a derivative in the disk cache
+        """
+        if self.cache is None:
+            return False
+        entry = self.cache.load(self._digest(key))
+        if 'ccode' not in entry:
+            return False
+        self._codes[key] = entry['ccode']
+        return True
+
+    def _store(self, key: tuple, expr: Symbol):
+        self._derivatives[key] = expr
+        if self.cache is not None:
+            self.cache.save(self._digest(key), expr=base64.b64encode(pickle.dumps(expr)).decode())
+
+    def _store_code(self, key: tuple, code: str):
+        self._codes[key] = code
+        if self.cache is not None:
+            self.cache.save(self._digest(key), ccode=code)
+
+    def fill(self, variables: tuple, order: int):
+        """
+        Compute all derivatives up to order, lowest order first
+        """
+        for n in range(1, order + 1):
+            for key in lattice(variables, n):
+                self[key]
+
+    def __contains__(self, variables) -> bool:
+        return self.key(variables) in self._derivatives
+
+    def __len__(self):
+        return len(self._derivatives)
+
+
+def differentiate(expr: Symbol, variable: Symbol, count: int) -> Symbol:
+    with trace.span('diff', variable=str(variable), count=count):
+        return expr.diff(variable, count)
+
+
+def ccodes(exprs, executor=None) -> list:
+    if executor is None:
+        with trace.span('ccode', expressions=len(exprs)):
+            return [ccode(expr) for expr in exprs]
+    return list(executor.map(_ccode, map(pickle.dumps, exprs)))
+
+
+def loads(data: bytes) -> Symbol:
+    """
+    Unpickle an expression without re-evaluating it, which could change
+    its structure and hence its printed form
+    """
+    with evaluate(False):
+        return pickle.loads(data)
+
+
+_tables = {}
+
+
+def _code(data: bytes, key: tuple) -> str:
+    """
+    C code of a derivative from a pickled table, kept for later jobs
+    """
+    if data not in _tables:
+        _tables[data] = loads(data)
+    return _tables[data].code(key)
+
+
+def _differentiate(data: bytes, variable: Symbol, count: int) -> bytes:
+    return pickle.dumps(differentiate(loads(data), variable, count))
+
+
+def _ccode(data: bytes) -> str:
+    return ccode(loads(data))
+
+
+def lattice(variables: tuple, order: int):
+    """
+    All multisets of variables of given order, in the order of the
+    Dalton derivative structs
+    """
+    return itertools.combinations_with_replacement(variables, order)
@@ -1,12 +1,17 @@
 import textwrap
 
-from sympy import Symbol, ccode
+from sympy import Symbol
 
+from .base import Component
+from .derivatives import lattice
 from .func import Functional
+from .printer import ccode
 
 
 class ExampleFunctional(Functional):
 
+    prefix = 'EPREF*'
+
     def __init__(
             self, name: str, ra: Symbol, rb: Symbol, ga: Symbol, gb: Symbol,
             Fa: Symbol, Fb: Symbol, **kwargs
@@ -15,6 +20,8 @@ class ExampleFunctional(Functional):
         self.ga = ga
         self.gb = gb
         self.gga = 1
+        self.variables = (ra, rb, ga, gb)
+        self.dFb = self.beta_table(self.Fb)
 
     def energy(self):
         code = textwrap.dedent(
@@ -29,74 +36,16 @@ class ExampleFunctional(Functional):
         )
         return code
 
-    def gradient(self):
-        code = textwrap.dedent(
-            f"""
-            static void
-            {self.name}_first(FunFirstFuncDrv *ds, real factor, const FunDensProp* dp)
-            {{
-              ds->df1000 += EPREF*({ccode(self.Fa.diff(self.ra))})*factor;
-              ds->df0010 += EPREF*({ccode(self.Fa.diff(self.ga))})*factor;
-            }}
-            """
-        )
-        return code
-
-    def hessian(self):
-        code = textwrap.dedent(
-            f"""
-            static void
-            {self.name}_second(FunSecondFuncDrv *ds, real factor, const FunDensProp* dp)
-            {{
-              ds->df1000 += EPREF*({ccode(self.Fa.diff(self.ra))})*factor;
-              ds->df0010 += EPREF*({ccode(self.Fa.diff(self.ga))})*factor;
-              ds->df1010 += EPREF*({ccode(self.Fa.diff(self.ga, self.ra))})*factor;
-              ds->df0020 += EPREF*({ccode(self.Fa.diff(self.ga, self.ga))})*factor;
-            }}
-            """
-        )
-        return code
-
-    def third(self):
-        code = textwrap.dedent(
-            f"""
-            static void
-            {self.name}_third(FunThirdFuncDrv *ds, real factor, const FunDensProp* dp)
-            {{
-              ds->df1000 += EPREF*({ccode(self.Fa.diff(self.ra))})*factor;
-              ds->df0010 += EPREF*({ccode(self.Fa.diff(self.ga))})*factor;
-              ds->df1010 += EPREF*({ccode(self.Fa.diff(self.ga, self.ra))})*factor;
-              ds->df0020 += EPREF*({ccode(self.Fa.diff(self.ga, self.ga))})*factor;
-
-              ds->df1020 += EPREF*({ccode(self.Fa.diff(self.ga, self.ga, self.ra))})*factor;
-              ds->df0030 += EPREF*({ccode(self.Fa.diff(self.ga, self.ga, self.ga))})*factor;
-            }}
-            """
-        )
-
-        return code
-
-    def fourth(self):
-        code = textwrap.dedent(
-            f"""
-            static void
-            {self.name}_fourth(FunFourthFuncDrv *ds, real factor, const FunDensProp* dp)
-            {{
-              ds->df1000 += EPREF*({ccode(self.Fa.diff(self.ra))})*factor;
-              ds->df0010 += EPREF*({ccode(self.Fa.diff(self.ga))})*factor;
-              ds->df1010 += EPREF*({ccode(self.Fa.diff(self.ga, self.ra))})*factor;
-              ds->df0020 += EPREF*({ccode(self.Fa.diff(self.ga, self.ga))})*factor;
-
-              ds->df1020 += EPREF*({ccode(self.Fa.diff(self.ga, self.ga, self.ra))})*factor;
-              ds->df0030 += EPREF*({ccode(self.Fa.diff(self.ga, self.ga, self.ga))})*factor;
-
-              ds->df4000 += EPREF*({ccode(self.Fa.diff(self.ra, self.ra, self.ra, self.ra))})*factor;
-              ds->df3010 += EPREF*({ccode(self.Fa.diff(self.ra, self.ra, self.ra, self.ga))})*factor;
-              ds->df2020 += EPREF*({ccode(self.Fa.diff(self.ra, self.ra, self.ga, self.ga))})*factor;
-              ds->df1030 += EPREF*({ccode(self.Fa.diff(self.ra, self.ga, self.ga, self.ga))})*factor;
-              ds->df0040 += EPREF*({ccode(self.Fa.diff(self.ga, self.ga, self.ga, self.ga))})*factor;
-            }}
-            """
-        )
-
-        return code
+    def layout(self, order):
+        ra, ga = self.ra, self.ga
+        groups = [[(ra,), (ga,)]]
+        if order > 1:
+            groups[0] += [(ra, ga), (ga, ga)]
+        if order > 2:
+            groups.append([(ra, ga, ga), (ga, ga, ga)])
+        if order > 3:
+            groups.append(list(lattice((ra, ga), 4)))
+        return [(None, [
+            [Component(self.label(key), self.dFa, key) for key in group]
+            for group in groups
+        ])]
@@ -1,8 +1,14 @@
+import re
 import textwrap
 
-from sympy import Symbol, ccode
+import sympy
+from sympy import Symbol
 
+from . import trace
+from .derivatives import DerivativeTable
 from .func import Functional
+from .gga import GGAFunctional
+from .printer import ccode
 
 
 class GeneralFunctional(Functional):
@@ -15,8 +21,23 @@ class GeneralFunctional(Functional):
         self.ga = ga
         self.gb = gb
         self.gab = gab
-        self.F = F
+        self.F = F = self.normalize(F)
         self.gga = 1
+        self.variables = (ra, rb, ga, gb, gab)
+        swap = self.swap()
+        if self.spin_symmetry and F.xreplace(swap) == F:
+            # mixed derivatives come in mirror image pairs, compute half
+            self.dF = DerivativeTable(F, self.cache, swap=swap)
+        else:
+            self.dF = DerivativeTable(F, self.cache)
+        self.separable = False
+        if kwargs.get('separable', True) and gab not in F.free_symbols:
+            parts = separate(F, (ra, ga), (rb, gb))
+            if parts is not None:
+                self.separable = True
+                self.Fa, self.Fb = parts
+                self.dFa = DerivativeTable(self.Fa, self.cache)
+                self.dFb = self.beta_table(self.Fb)
 
     def energy(self):
         code = textwrap.dedent(
@@ -31,269 +52,49 @@ class GeneralFunctional(Functional):
         )
         return code
 
-    def gradient(self):
-        code = textwrap.dedent(
-            f"""
-            static void
-            {self.name}_first(FunFirstFuncDrv *ds, real factor, const FunDensProp* dp)
-            {{
-              ds->df1000 += ({ccode(self.F.diff(self.ra))})*factor;
-              ds->df0100 += ({ccode(self.F.diff(self.rb))})*factor;
-              ds->df0010 += ({ccode(self.F.diff(self.ga))})*factor;
-              ds->df0001 += ({ccode(self.F.diff(self.gb))})*factor;
-              ds->df00001 += ({ccode(self.F.diff(self.gab))})*factor;
-            }}
-            """
-        )
-        code = comment_zero_lines(code)
-        return code
-
-    def hessian(self):
-        code = textwrap.dedent(
-            f"""
-            static void
-            {self.name}_second(FunSecondFuncDrv *ds, real factor, const FunDensProp* dp)
-            {{
-              ds->df1000 += ({ccode(self.F.diff(self.ra))})*factor;
-              ds->df0100 += ({ccode(self.F.diff(self.rb))})*factor;
-              ds->df0010 += ({ccode(self.F.diff(self.ga))})*factor;
-              ds->df0001 += ({ccode(self.F.diff(self.gb))})*factor;
-              ds->df00001 += ({ccode(self.F.diff(self.gab))})*factor;
-
-              ds->df2000 += ({ccode(self.F.diff(self.ra, self.ra))})*factor;
-              ds->df1100 += ({ccode(self.F.diff(self.ra, self.rb))})*factor;
-              ds->df1010 += ({ccode(self.F.diff(self.ra, self.ga))})*factor;
-              ds->df1001 += ({ccode(self.F.diff(self.ra, self.gb))})*factor;
-              ds->df10001 += ({ccode(self.F.diff(self.ra, self.gab))})*factor;
-              ds->df0200 += ({ccode(self.F.diff(self.rb, self.rb))})*factor;
-              ds->df0110 += ({ccode(self.F.diff(self.rb, self.ga))})*factor;
-              ds->df0101 += ({ccode(self.F.diff(self.rb, self.gb))})*factor;
-              ds->df01001 += ({ccode(self.F.diff(self.rb, self.gab))})*factor;
-              ds->df0020 += ({ccode(self.F.diff(self.ga, self.ga))})*factor;
-              ds->df0011 += ({ccode(self.F.diff(self.ga, self.gb))})*factor;
-              ds->df00101 += ({ccode(self.F.diff(self.ga, self.gab))})*factor;
-              ds->df0002 += ({ccode(self.F.diff(self.gb, self.gb))})*factor;
-              ds->df00011 += ({ccode(self.F.diff(self.gb, self.gab))})*factor;
-              ds->df00002 += ({ccode(self.F.diff(self.gab, self.gab))})*factor;
-
-            }}
-            """
-        )
-        code = comment_zero_lines(code)
-        return code
-
-    def third(self):
-        code = textwrap.dedent(
-            f"""
-            static void
-            {self.name}_third(FunThirdFuncDrv *ds, real factor, const FunDensProp* dp)
-            {{
-              ds->df1000 += ({ccode(self.F.diff(self.ra))})*factor;
-              ds->df0100 += ({ccode(self.F.diff(self.rb))})*factor;
-              ds->df0010 += ({ccode(self.F.diff(self.ga))})*factor;
-              ds->df0001 += ({ccode(self.F.diff(self.gb))})*factor;
-              ds->df00001 += ({ccode(self.F.diff(self.gab))})*factor;
-
-              ds->df2000 += ({ccode(self.F.diff(self.ra, self.ra))})*factor;
-              ds->df1100 += ({ccode(self.F.diff(self.ra, self.rb))})*factor;
-              ds->df1010 += ({ccode(self.F.diff(self.ra, self.ga))})*factor;
-              ds->df1001 += ({ccode(self.F.diff(self.ra, self.gb))})*factor;
-              ds->df10001 += ({ccode(self.F.diff(self.ra, self.gab))})*factor;
-              ds->df0200 += ({ccode(self.F.diff(self.rb, self.rb))})*factor;
-              ds->df0110 += ({ccode(self.F.diff(self.rb, self.ga))})*factor;
-              ds->df0101 += ({ccode(self.F.diff(self.rb, self.gb))})*factor;
-              ds->df01001 += ({ccode(self.F.diff(self.rb, self.gab))})*factor;
-              ds->df0020 += ({ccode(self.F.diff(self.ga, self.ga))})*factor;
-              ds->df0011 += ({ccode(self.F.diff(self.ga, self.gb))})*factor;
-              ds->df00101 += ({ccode(self.F.diff(self.ga, self.gab))})*factor;
-              ds->df0002 += ({ccode(self.F.diff(self.gb, self.gb))})*factor;
-              ds->df00011 += ({ccode(self.F.diff(self.gb, self.gab))})*factor;
-              ds->df00002 += ({ccode(self.F.diff(self.gab, self.gab))})*factor;
-              ds->df3000 += ({ccode(self.F.diff(self.ra, self.ra, self.ra))})*factor;
-              ds->df2100 += ({ccode(self.F.diff(self.ra, self.ra, self.rb))})*factor;
-              ds->df2010 += ({ccode(self.F.diff(self.ra, self.ra, self.ga))})*factor;
-              ds->df2001 += ({ccode(self.F.diff(self.ra, self.ra, self.gb))})*factor;
-              ds->df20001 += ({ccode(self.F.diff(self.ra, self.ra, self.gab))})*factor;
-              ds->df1200 += ({ccode(self.F.diff(self.ra, self.rb, self.rb))})*factor;
-              ds->df1110 += ({ccode(self.F.diff(self.ra, self.rb, self.ga))})*factor;
-              ds->df1101 += ({ccode(self.F.diff(self.ra, self.rb, self.gb))})*factor;
-              ds->df11001 += ({ccode(self.F.diff(self.ra, self.rb, self.gab))})*factor;
-              ds->df1020 += ({ccode(self.F.diff(self.ra, self.ga, self.ga))})*factor;
-              ds->df1011 += ({ccode(self.F.diff(self.ra, self.ga, self.gb))})*factor;
-              ds->df10101 += ({ccode(self.F.diff(self.ra, self.ga, self.gab))})*factor;
-              ds->df1002 += ({ccode(self.F.diff(self.ra, self.gb, self.gb))})*factor;
-              ds->df10011 += ({ccode(self.F.diff(self.ra, self.gb, self.gab))})*factor;
-              ds->df10002 += ({ccode(self.F.diff(self.ra, self.gab, self.gab))})*factor;
+    def function_lines(self, order, flags, costs=None):
+        return map(comment_zero_line, super().function_lines(order, flags, costs))
 
-              ds->df0300 += ({ccode(self.F.diff(self.rb, self.rb, self.rb))})*factor;
-              ds->df0210 += ({ccode(self.F.diff(self.rb, self.rb, self.ga))})*factor;
-              ds->df0201 += ({ccode(self.F.diff(self.rb, self.rb, self.gb))})*factor;
-              ds->df02001 += ({ccode(self.F.diff(self.rb, self.rb, self.gab))})*factor;
-              ds->df0120 += ({ccode(self.F.diff(self.rb, self.ga, self.ga))})*factor;
-              ds->df0111 += ({ccode(self.F.diff(self.rb, self.ga, self.gb))})*factor;
-              ds->df01101 += ({ccode(self.F.diff(self.rb, self.ga, self.gab))})*factor;
-              ds->df0102 += ({ccode(self.F.diff(self.rb, self.gb, self.gb))})*factor;
-              ds->df01011 += ({ccode(self.F.diff(self.rb, self.gb, self.gab))})*factor;
-              ds->df01002 += ({ccode(self.F.diff(self.rb, self.gab, self.gab))})*factor;
-              ds->df0030 += ({ccode(self.F.diff(self.ga, self.ga, self.ga))})*factor;
-              ds->df0021 += ({ccode(self.F.diff(self.ga, self.ga, self.gb))})*factor;
-              ds->df00201 += ({ccode(self.F.diff(self.ga, self.ga, self.gab))})*factor;
-              ds->df0012 += ({ccode(self.F.diff(self.ga, self.gb, self.gb))})*factor;
-              ds->df00111 += ({ccode(self.F.diff(self.ga, self.gb, self.gab))})*factor;
-              ds->df00102 += ({ccode(self.F.diff(self.ga, self.gab, self.gab))})*factor;
-              ds->df0003 += ({ccode(self.F.diff(self.gb, self.gb, self.gb))})*factor;
-              ds->df00021 += ({ccode(self.F.diff(self.gb, self.gb, self.gab))})*factor;
-              ds->df00012 += ({ccode(self.F.diff(self.gb, self.gab, self.gab))})*factor;
-              ds->df00003 += ({ccode(self.F.diff(self.gab, self.gab, self.gab))})*factor;
-            }}
-            """
+    def layout(self, order):
+        if self.separable:
+            # F = Fa(ra, ga) + Fb(rb, gb): all mixed derivatives vanish
+            return GGAFunctional.layout(self, order)
+        first, *higher = (
+            self.components(self.dF, self.variables, [n])
+            for n in range(1, order + 1)
         )
+        if order == 2:
+            # trailing blank line as in the original hand-written hessian
+            higher.append([])
+        if order > 2:
+            # third order terms in rhoa are grouped with the second order
+            second, third, *fourth = higher
+            split = sum(component.variables[0] == self.ra for component in third)
+            higher = [second + third[:split], third[split:], *fourth]
+        return [(None, [first, *higher])]
+
+
+def separate(F: Symbol, alpha: tuple, beta: tuple):
+    """
+    Split F additively into (Fa, Fb) with Fa independent of the beta
+    variables and Fb of the alpha variables, or None if F is not separable
+    """
+    Fa, Fb = [], []
+    for term in sympy.Add.make_args(F):
+        symbols = term.free_symbols
+        if symbols & set(beta):
+            if symbols & set(alpha):
+                return None
+            Fb.append(term)
+        else:
+            Fa.append(term)
+    return sympy.Add(*Fa), sympy.Add(*Fb)
 
-        code = comment_zero_lines(code)
-        return code
-
-    def fourth(self):
-        code = textwrap.dedent(
-            f"""
-            static void
-            {self.name}_fourth(FunFourthFuncDrv *ds, real factor, const FunDensProp* dp)
-            {{
-              ds->df1000 += ({ccode(self.F.diff(self.ra))})*factor;
-              ds->df0100 += ({ccode(self.F.diff(self.rb))})*factor;
-              ds->df0010 += ({ccode(self.F.diff(self.ga))})*factor;
-              ds->df0001 += ({ccode(self.F.diff(self.gb))})*factor;
-              ds->df00001 += ({ccode(self.F.diff(self.gab))})*factor;
 
-              ds->df2000 += ({ccode(self.F.diff(self.ra, self.ra))})*factor;
-              ds->df1100 += ({ccode(self.F.diff(self.ra, self.rb))})*factor;
-              ds->df1010 += ({ccode(self.F.diff(self.ra, self.ga))})*factor;
-              ds->df1001 += ({ccode(self.F.diff(self.ra, self.gb))})*factor;
-              ds->df10001 += ({ccode(self.F.diff(self.ra, self.gab))})*factor;
-              ds->df0200 += ({ccode(self.F.diff(self.rb, self.rb))})*factor;
-              ds->df0110 += ({ccode(self.F.diff(self.rb, self.ga))})*factor;
-              ds->df0101 += ({ccode(self.F.diff(self.rb, self.gb))})*factor;
-              ds->df01001 += ({ccode(self.F.diff(self.rb, self.gab))})*factor;
-              ds->df0020 += ({ccode(self.F.diff(self.ga, self.ga))})*factor;
-              ds->df0011 += ({ccode(self.F.diff(self.ga, self.gb))})*factor;
-              ds->df00101 += ({ccode(self.F.diff(self.ga, self.gab))})*factor;
-              ds->df0002 += ({ccode(self.F.diff(self.gb, self.gb))})*factor;
-              ds->df00011 += ({ccode(self.F.diff(self.gb, self.gab))})*factor;
-              ds->df00002 += ({ccode(self.F.diff(self.gab, self.gab))})*factor;
-              ds->df3000 += ({ccode(self.F.diff(self.ra, self.ra, self.ra))})*factor;
-              ds->df2100 += ({ccode(self.F.diff(self.ra, self.ra, self.rb))})*factor;
-              ds->df2010 += ({ccode(self.F.diff(self.ra, self.ra, self.ga))})*factor;
-              ds->df2001 += ({ccode(self.F.diff(self.ra, self.ra, self.gb))})*factor;
-              ds->df20001 += ({ccode(self.F.diff(self.ra, self.ra, self.gab))})*factor;
-              ds->df1200 += ({ccode(self.F.diff(self.ra, self.rb, self.rb))})*factor;
-              ds->df1110 += ({ccode(self.F.diff(self.ra, self.rb, self.ga))})*factor;
-              ds->df1101 += ({ccode(self.F.diff(self.ra, self.rb, self.gb))})*factor;
-              ds->df11001 += ({ccode(self.F.diff(self.ra, self.rb, self.gab))})*factor;
-              ds->df1020 += ({ccode(self.F.diff(self.ra, self.ga, self.ga))})*factor;
-              ds->df1011 += ({ccode(self.F.diff(self.ra, self.ga, self.gb))})*factor;
-              ds->df10101 += ({ccode(self.F.diff(self.ra, self.ga, self.gab))})*factor;
-              ds->df1002 += ({ccode(self.F.diff(self.ra, self.gb, self.gb))})*factor;
-              ds->df10011 += ({ccode(self.F.diff(self.ra, self.gb, self.gab))})*factor;
-              ds->df10002 += ({ccode(self.F.diff(self.ra, self.gab, self.gab))})*factor;
-
-              ds->df0300 += ({ccode(self.F.diff(self.rb, self.rb, self.rb))})*factor;
-              ds->df0210 += ({ccode(self.F.diff(self.rb, self.rb, self.ga))})*factor;
-              ds->df0201 += ({ccode(self.F.diff(self.rb, self.rb, self.gb))})*factor;
-              ds->df02001 += ({ccode(self.F.diff(self.rb, self.rb, self.gab))})*factor;
-              ds->df0120 += ({ccode(self.F.diff(self.rb, self.ga, self.ga))})*factor;
-              ds->df0111 += ({ccode(self.F.diff(self.rb, self.ga, self.gb))})*factor;
-              ds->df01101 += ({ccode(self.F.diff(self.rb, self.ga, self.gab))})*factor;
-              ds->df0102 += ({ccode(self.F.diff(self.rb, self.gb, self.gb))})*factor;
-              ds->df01011 += ({ccode(self.F.diff(self.rb, self.gb, self.gab))})*factor;
-              ds->df01002 += ({ccode(self.F.diff(self.rb, self.gab, self.gab))})*factor;
-              ds->df0030 += ({ccode(self.F.diff(self.ga, self.ga, self.ga))})*factor;
-              ds->df0021 += ({ccode(self.F.diff(self.ga, self.ga, self.gb))})*factor;
-              ds->df00201 += ({ccode(self.F.diff(self.ga, self.ga, self.gab))})*factor;
-              ds->df0012 += ({ccode(self.F.diff(self.ga, self.gb, self.gb))})*factor;
-              ds->df00111 += ({ccode(self.F.diff(self.ga, self.gb, self.gab))})*factor;
-              ds->df00102 += ({ccode(self.F.diff(self.ga, self.gab, self.gab))})*factor;
-              ds->df0003 += ({ccode(self.F.diff(self.gb, self.gb, self.gb))})*factor;
-              ds->df00021 += ({ccode(self.F.diff(self.gb, self.gb, self.gab))})*factor;
-              ds->df00012 += ({ccode(self.F.diff(self.gb, self.gab, self.gab))})*factor;
-              ds->df00003 += ({ccode(self.F.diff(self.gab, self.gab, self.gab))})*factor;
-
-              ds->df4000 += ({ccode(self.F.diff(self.ra, self.ra, self.ra, self.ra))})*factor;
-              ds->df3100 += ({ccode(self.F.diff(self.ra, self.ra, self.ra, self.rb))})*factor;
-              ds->df3010 += ({ccode(self.F.diff(self.ra, self.ra, self.ra, self.ga))})*factor;
-              ds->df3001 += ({ccode(self.F.diff(self.ra, self.ra, self.ra, self.gb))})*factor;
-              ds->df30001 += ({ccode(self.F.diff(self.ra, self.ra, self.ra, self.gab))})*factor;
-              ds->df2200 += ({ccode(self.F.diff(self.ra, self.ra, self.rb, self.rb))})*factor;
-              ds->df2110 += ({ccode(self.F.diff(self.ra, self.ra, self.rb, self.ga))})*factor;
-              ds->df2101 += ({ccode(self.F.diff(self.ra, self.ra, self.rb, self.gb))})*factor;
-              ds->df21001 += ({ccode(self.F.diff(self.ra, self.ra, self.rb, self.gab))})*factor;
-              ds->df2020 += ({ccode(self.F.diff(self.ra, self.ra, self.ga, self.ga))})*factor;
-              ds->df2011 += ({ccode(self.F.diff(self.ra, self.ra, self.ga, self.gb))})*factor;
-              ds->df20101 += ({ccode(self.F.diff(self.ra, self.ra, self.ga, self.gab))})*factor;
-              ds->df2002 += ({ccode(self.F.diff(self.ra, self.ra, self.gb, self.gb))})*factor;
-              ds->df20011 += ({ccode(self.F.diff(self.ra, self.ra, self.gb, self.gab))})*factor;
-              ds->df20002 += ({ccode(self.F.diff(self.ra, self.ra, self.gab, self.gab))})*factor;
-              ds->df1300 += ({ccode(self.F.diff(self.ra, self.rb, self.rb, self.rb))})*factor;
-              ds->df1210 += ({ccode(self.F.diff(self.ra, self.rb, self.rb, self.ga))})*factor;
-              ds->df1201 += ({ccode(self.F.diff(self.ra, self.rb, self.rb, self.gb))})*factor;
-              ds->df12001 += ({ccode(self.F.diff(self.ra, self.rb, self.rb, self.gab))})*factor;
-              ds->df1120 += ({ccode(self.F.diff(self.ra, self.rb, self.ga, self.ga))})*factor;
-              ds->df1111 += ({ccode(self.F.diff(self.ra, self.rb, self.ga, self.gb))})*factor;
-              ds->df11101 += ({ccode(self.F.diff(self.ra, self.rb, self.ga, self.gab))})*factor;
-              ds->df1102 += ({ccode(self.F.diff(self.ra, self.rb, self.gb, self.gb))})*factor;
-              ds->df11011 += ({ccode(self.F.diff(self.ra, self.rb, self.gb, self.gab))})*factor;
-              ds->df11002 += ({ccode(self.F.diff(self.ra, self.rb, self.gab, self.gab))})*factor;
-              ds->df1030 += ({ccode(self.F.diff(self.ra, self.ga, self.ga, self.ga))})*factor;
-              ds->df1021 += ({ccode(self.F.diff(self.ra, self.ga, self.ga, self.gb))})*factor;
-              ds->df10201 += ({ccode(self.F.diff(self.ra, self.ga, self.ga, self.gab))})*factor;
-              ds->df1012 += ({ccode(self.F.diff(self.ra, self.ga, self.gb, self.gb))})*factor;
-              ds->df10111 += ({ccode(self.F.diff(self.ra, self.ga, self.gb, self.gab))})*factor;
-              ds->df10102 += ({ccode(self.F.diff(self.ra, self.ga, self.gab, self.gab))})*factor;
-              ds->df1003 += ({ccode(self.F.diff(self.ra, self.gb, self.gb, self.gb))})*factor;
-              ds->df10021 += ({ccode(self.F.diff(self.ra, self.gb, self.gb, self.gab))})*factor;
-              ds->df10012 += ({ccode(self.F.diff(self.ra, self.gb, self.gab, self.gab))})*factor;
-              ds->df10003 += ({ccode(self.F.diff(self.ra, self.gab, self.gab, self.gab))})*factor;
-              ds->df0400 += ({ccode(self.F.diff(self.rb, self.rb, self.rb, self.rb))})*factor;
-              ds->df0310 += ({ccode(self.F.diff(self.rb, self.rb, self.rb, self.ga))})*factor;
-              ds->df0301 += ({ccode(self.F.diff(self.rb, self.rb, self.rb, self.gb))})*factor;
-              ds->df03001 += ({ccode(self.F.diff(self.rb, self.rb, self.rb, self.gab))})*factor;
-              ds->df0220 += ({ccode(self.F.diff(self.rb, self.rb, self.ga, self.ga))})*factor;
-              ds->df0211 += ({ccode(self.F.diff(self.rb, self.rb, self.ga, self.gb))})*factor;
-              ds->df02101 += ({ccode(self.F.diff(self.rb, self.rb, self.ga, self.gab))})*factor;
-              ds->df0202 += ({ccode(self.F.diff(self.rb, self.rb, self.gb, self.gb))})*factor;
-              ds->df02011 += ({ccode(self.F.diff(self.rb, self.rb, self.gb, self.gab))})*factor;
-              ds->df02002 += ({ccode(self.F.diff(self.rb, self.rb, self.gab, self.gab))})*factor;
-              ds->df0130 += ({ccode(self.F.diff(self.rb, self.ga, self.ga, self.ga))})*factor;
-              ds->df0121 += ({ccode(self.F.diff(self.rb, self.ga, self.ga, self.gb))})*factor;
-              ds->df01201 += ({ccode(self.F.diff(self.rb, self.ga, self.ga, self.gab))})*factor;
-              ds->df0112 += ({ccode(self.F.diff(self.rb, self.ga, self.gb, self.gb))})*factor;
-              ds->df01111 += ({ccode(self.F.diff(self.rb, self.ga, self.gb, self.gab))})*factor;
-              ds->df01102 += ({ccode(self.F.diff(self.rb, self.ga, self.gab, self.gab))})*factor;
-              ds->df0103 += ({ccode(self.F.diff(self.rb, self.gb, self.gb, self.gb))})*factor;
-              ds->df01021 += ({ccode(self.F.diff(self.rb, self.gb, self.gb, self.gab))})*factor;
-              ds->df01012 += ({ccode(self.F.diff(self.rb, self.gb, self.gab, self.gab))})*factor;
-              ds->df01003 += ({ccode(self.F.diff(self.rb, self.gab, self.gab, self.gab))})*factor;
-              ds->df0040 += ({ccode(self.F.diff(self.ga, self.ga, self.ga, self.ga))})*factor;
-              ds->df0031 += ({ccode(self.F.diff(self.ga, self.ga, self.ga, self.gb))})*factor;
-              ds->df00301 += ({ccode(self.F.diff(self.ga, self.ga, self.ga, self.gab))})*factor;
-              ds->df0022 += ({ccode(self.F.diff(self.ga, self.ga, self.gb, self.gb))})*factor;
-              ds->df00211 += ({ccode(self.F.diff(self.ga, self.ga, self.gb, self.gab))})*factor;
-              ds->df00202 += ({ccode(self.F.diff(self.ga, self.ga, self.gab, self.gab))})*factor;
-              ds->df0013 += ({ccode(self.F.diff(self.ga, self.gb, self.gb, self.gb))})*factor;
-              ds->df00121 += ({ccode(self.F.diff(self.ga, self.gb, self.gb, self.gab))})*factor;
-              ds->df00112 += ({ccode(self.F.diff(self.ga, self.gb, self.gab, self.gab))})*factor;
-              ds->df00103 += ({ccode(self.F.diff(self.ga, self.gab, self.gab, self.gab))})*factor;
-              ds->df0004 += ({ccode(self.F.diff(self.gb, self.gb, self.gb, self.gb))})*factor;
-              ds->df00031 += ({ccode(self.F.diff(self.gb, self.gb, self.gb, self.gab))})*factor;
-              ds->df00022 += ({ccode(self.F.diff(self.gb, self.gb, self.gab, self.gab))})*factor;
-              ds->df00013 += ({ccode(self.F.diff(self.gb, self.gab, self.gab, self.gab))})*factor;
-              ds->df00004 += ({ccode(self.F.diff(self.gab, self.gab, self.gab, self.gab))})*factor;
-            }}
-            """
-        )
-
-        code = comment_zero_lines(code)
-        return code
+def comment_zero_lines(code):
+    with trace.span('comment_zero_lines'):
+        return '\n'.join(map(comment_zero_line, code.split('\n')))
 
 
-def comment_zero_lines(code):
-    import re
-    return re.sub(r'\n(\s*)(.*)= \(0\)\*factor;', r'\n\1// \2= (0)*factor;', code)
+def comment_zero_line(line):
+    return re.sub(r'^(\s*)(?!\s|//)(.*)= \(0\)\*factor;', r'\1// \2= (0)*factor;', line)
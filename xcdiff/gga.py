@@ -1,8 +1,9 @@
 import textwrap
 
-from sympy import Symbol, ccode
+from sympy import Symbol
 
 from .func import Functional
+from .printer import ccode
 
 
 class GGAFunctional(Functional):
@@ -15,6 +16,8 @@ class GGAFunctional(Functional):
         self.ga = ga
         self.gb = gb
         self.gga = 1
+        self.variables = (ra, rb, ga, gb)
+        self.dFb = self.beta_table(self.Fb)
 
     def energy(self):
         code = textwrap.dedent(
@@ -29,124 +32,9 @@ class GGAFunctional(Functional):
         )
         return code
 
-    def gradient(self):
-        code = textwrap.dedent(
-            f"""
-            static void
-            {self.name}_first(FunFirstFuncDrv *ds, real factor, const FunDensProp* dp)
-            {{
-              ds->df1000 += ({ccode(self.Fa.diff(self.ra))})*factor;
-              ds->df0010 += ({ccode(self.Fa.diff(self.ga))})*factor;
-
-              ds->df0100 += ({ccode(self.Fb.diff(self.rb))})*factor;
-              ds->df0001 += ({ccode(self.Fb.diff(self.gb))})*factor;
-            }}
-            """
-        )
-        return code
-
-    def hessian(self):
-        code = textwrap.dedent(
-            f"""
-            static void
-            {self.name}_second(FunSecondFuncDrv *ds, real factor, const FunDensProp* dp)
-            {{
-              ds->df1000 += ({ccode(self.Fa.diff(self.ra))})*factor;
-              ds->df0010 += ({ccode(self.Fa.diff(self.ga))})*factor;
-
-              ds->df2000 += ({ccode(self.Fa.diff(self.ra, self.ra))})*factor;
-              ds->df1010 += ({ccode(self.Fa.diff(self.ra, self.ga))})*factor;
-              ds->df0020 += ({ccode(self.Fa.diff(self.ga, self.ga))})*factor;
-
-              ds->df0100 += ({ccode(self.Fb.diff(self.rb))})*factor;
-              ds->df0001 += ({ccode(self.Fb.diff(self.gb))})*factor;
-
-              ds->df0200 += ({ccode(self.Fb.diff(self.rb, self.rb))})*factor;
-              ds->df0101 += ({ccode(self.Fb.diff(self.rb, self.gb))})*factor;
-              ds->df0002 += ({ccode(self.Fb.diff(self.gb, self.gb))})*factor;
-            }}
-            """
-        )
-        return code
-
-    def third(self):
-        code = textwrap.dedent(
-            f"""
-            static void
-            {self.name}_third(FunThirdFuncDrv *ds, real factor, const FunDensProp* dp)
-            {{
-              ds->df1000 += ({ccode(self.Fa.diff(self.ra))})*factor;
-              ds->df0010 += ({ccode(self.Fa.diff(self.ga))})*factor;
-
-              ds->df2000 += ({ccode(self.Fa.diff(self.ra, self.ra))})*factor;
-              ds->df1010 += ({ccode(self.Fa.diff(self.ra, self.ga))})*factor;
-              ds->df0020 += ({ccode(self.Fa.diff(self.ga, self.ga))})*factor;
-
-              ds->df3000 += ({ccode(self.Fa.diff(self.ra, self.ra, self.ra))})*factor;
-              ds->df2010 += ({ccode(self.Fa.diff(self.ra, self.ra, self.ga))})*factor;
-              ds->df1020 += ({ccode(self.Fa.diff(self.ra, self.ga, self.ga))})*factor;
-              ds->df0030 += ({ccode(self.Fa.diff(self.ga, self.ga, self.ga))})*factor;
-
-              ds->df0100 += ({ccode(self.Fb.diff(self.rb))})*factor;
-              ds->df0001 += ({ccode(self.Fb.diff(self.gb))})*factor;
-
-              ds->df0200 += ({ccode(self.Fb.diff(self.rb, self.rb))})*factor;
-              ds->df0101 += ({ccode(self.Fb.diff(self.rb, self.gb))})*factor;
-              ds->df0002 += ({ccode(self.Fb.diff(self.gb, self.gb))})*factor;
-
-              ds->df0300 += ({ccode(self.Fb.diff(self.rb, self.rb, self.rb))})*factor;
-              ds->df0201 += ({ccode(self.Fb.diff(self.rb, self.rb, self.gb))})*factor;
-              ds->df0102 += ({ccode(self.Fb.diff(self.rb, self.gb, self.gb))})*factor;
-              ds->df0003 += ({ccode(self.Fb.diff(self.gb, self.gb, self.gb))})*factor;
-            }}
-            """
-        )
-
-        return code
-
-    def fourth(self):
-        code = textwrap.dedent(
-            f"""
-            static void
-            {self.name}_fourth(FunFourthFuncDrv *ds, real factor, const FunDensProp* dp)
-            {{
-              ds->df1000 += ({ccode(self.Fa.diff(self.ra))})*factor;
-              ds->df0010 += ({ccode(self.Fa.diff(self.ga))})*factor;
-
-              ds->df2000 += ({ccode(self.Fa.diff(self.ra, self.ra))})*factor;
-              ds->df1010 += ({ccode(self.Fa.diff(self.ra, self.ga))})*factor;
-              ds->df0020 += ({ccode(self.Fa.diff(self.ga, self.ga))})*factor;
-
-              ds->df3000 += ({ccode(self.Fa.diff(self.ra, self.ra, self.ra))})*factor;
-              ds->df2010 += ({ccode(self.Fa.diff(self.ra, self.ra, self.ga))})*factor;
-              ds->df1020 += ({ccode(self.Fa.diff(self.ra, self.ga, self.ga))})*factor;
-              ds->df0030 += ({ccode(self.Fa.diff(self.ga, self.ga, self.ga))})*factor;
-
-              ds->df4000 += ({ccode(self.Fa.diff(self.ra, self.ra, self.ra, self.ra))})*factor;
-              ds->df3010 += ({ccode(self.Fa.diff(self.ra, self.ra, self.ra, self.ga))})*factor;
-              ds->df2020 += ({ccode(self.Fa.diff(self.ra, self.ra, self.ga, self.ga))})*factor;
-              ds->df1030 += ({ccode(self.Fa.diff(self.ra, self.ga, self.ga, self.ga))})*factor;
-              ds->df0040 += ({ccode(self.Fa.diff(self.ga, self.ga, self.ga, self.ga))})*factor;
-
-              ds->df0100 += ({ccode(self.Fb.diff(self.rb))})*factor;
-              ds->df0001 += ({ccode(self.Fb.diff(self.gb))})*factor;
-
-              ds->df0200 += ({ccode(self.Fb.diff(self.rb, self.rb))})*factor;
-              ds->df0101 += ({ccode(self.Fb.diff(self.rb, self.gb))})*factor;
-              ds->df0002 += ({ccode(self.Fb.diff(self.gb, self.gb))})*factor;
-
-              ds->df0300 += ({ccode(self.Fb.diff(self.rb, self.rb, self.rb))})*factor;
-              ds->df0201 += ({ccode(self.Fb.diff(self.rb, self.rb, self.gb))})*factor;
-              ds->df0102 += ({ccode(self.Fb.diff(self.rb, self.gb, self.gb))})*factor;
-              ds->df0003 += ({ccode(self.Fb.diff(self.gb, self.gb, self.gb))})*factor;
-
-              ds->df0400 += ({ccode(self.Fb.diff(self.rb, self.rb, self.rb, self.rb))})*factor;
-              ds->df0301 += ({ccode(self.Fb.diff(self.rb, self.rb, self.rb, self.gb))})*factor;
-              ds->df0202 += ({ccode(self.Fb.diff(self.rb, self.rb, self.gb, self.gb))})*factor;
-              ds->df0103 += ({ccode(self.Fb.diff(self.rb, self.gb, self.gb, self.gb))})*factor;
-              ds->df0004 += ({ccode(self.Fb.diff(self.gb, self.gb, self.gb, self.gb))})*factor;
-            }}
-            """
-        )
-
-        return code
+    def layout(self, order):
+        orders = range(1, order + 1)
+        return [(None, [
+            *(self.components(self.dFa, (self.ra, self.ga), [n]) for n in orders),
+            *(self.components(self.dFb, (self.rb, self.gb), [n]) for n in orders),
+        ])]
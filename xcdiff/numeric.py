@@ -0,0 +1,122 @@
+"""
+NumPy evaluation of a functional and its derivative components on a grid
+
+    >>> evaluate = NumpyBackend(functional, order=2)
+    >>> values = evaluate(rhoa=rhoa, rhob=rhob, grada=grada, gradb=gradb)
+    >>> values['df1000']
+
+NumPy is only required by this module
+"""
+import re
+
+import numpy
+import sympy
+from sympy import Symbol
+
+from .base import array
+
+
+class NumpyBackend:
+    """
+    Vectorized callables for the energy and every ds->df... component of
+    the derivative functions up to given order, built from the derivative
+    tables of the functional
+
+    Constants of the C code, e.g. EPREF in the prefix of ExampleFunctional
+    or symbols defined in const, are given by name in constants; a
+    ValueError names any other symbol than the density variables
+    """
+
+    def __init__(self, functional, order: int = 1, constants: dict = None):
+        self.functional = functional
+        self.order = order
+        self.arrays = tuple(Symbol(array(v)) for v in functional.variables)
+        self.plain = dict(zip(functional.variables, self.arrays))
+        self.constants = {Symbol(name): value for name, value in (constants or {}).items()}
+        prefix = functional.prefix.rstrip('*')
+        self.scale = sympy.sympify(prefix) if prefix else sympy.S.One
+        self.check()
+        self.scale = self.scale.xreplace(self.constants)
+        self.functions = {'energy': self.energy_functions()}
+        for guard, groups in functional.layout(order):
+            mask = self.mask(guard)
+            for group in groups:
+                for component in group:
+                    self.functions.setdefault(component.label, []).append(
+                        (mask, self.lambdify(component.expr))
+                    )
+
+    def check(self):
+        """
+        Raise a ValueError if the functional or its prefix has symbols
+        without a value
+        """
+        exprs = [getattr(self.functional, e, None) for e in ('F', 'Fa', 'Fb')]
+        symbols = self.scale.free_symbols.union(
+            *(expr.free_symbols for expr in exprs if expr is not None)
+        )
+        unknown = symbols - set(self.functional.variables) - set(self.constants)
+        if unknown:
+            names = ', '.join(sorted(map(str, unknown)))
+            raise ValueError(f'{self.functional.name}: no value of {names}, give it in constants')
+
+    def lambdify(self, expr: Symbol):
+        expr = self.scale * expr.xreplace(self.plain).xreplace(self.constants)
+        return sympy.lambdify(self.arrays, expr, 'numpy')
+
+    def mask(self, guard: str):
+        """
+        Callable of a C guard such as dp->rhoa>SLATER_THRESHOLD, or None
+        """
+        if guard is None:
+            return None
+        functional = self.functional
+        guard = re.sub(r'dp->(\w+)', r'\1', guard)
+        threshold = repr(functional.threshold or 0)
+        guard = guard.replace(f'{functional.name.upper()}_THRESHOLD', threshold)
+        return sympy.lambdify(self.arrays, sympy.sympify(guard), 'numpy')
+
+    def energy_functions(self) -> list:
+        """
+        Terms of the energy as (mask, function) pairs, guarded by the
+        density thresholds for LDA functionals as in Functional.energy
+        """
+        functional = self.functional
+        if getattr(functional, 'F', None) is not None:
+            return [(None, self.lambdify(functional.F))]
+        if functional.gga:
+            return [(None, self.lambdify(functional.Fa + functional.Fb))]
+        threshold = f'{functional.name.upper()}_THRESHOLD'
+        return [
+            (self.mask(f'{functional.ra}>{threshold}'), self.lambdify(functional.Fa)),
+            (self.mask(f'{functional.rb}>{threshold}'), self.lambdify(functional.Fb)),
+        ]
+
+    def __call__(self, chunk_size: int = 2**16, **arrays) -> dict:
+        """
+        Energy and derivative components, keyed by energy and df labels,
+        on the grid points of the given arrays, in chunks of chunk_size
+        points to bound the memory of intermediates
+        """
+        missing = [str(a) for a in self.arrays if str(a) not in arrays]
+        if missing:
+            raise TypeError(f'missing arrays: {", ".join(missing)}')
+        inputs = [numpy.asarray(arrays[str(a)], dtype=float) for a in self.arrays]
+        shape = numpy.broadcast(*inputs).shape
+        inputs = [numpy.broadcast_to(a, shape).ravel() for a in inputs]
+        size = inputs[0].size if inputs else 0
+        values = {label: numpy.zeros(size) for label in self.functions}
+        for start in range(0, size, chunk_size):
+            chunk = [a[start:start + chunk_size] for a in inputs]
+            for label, terms in self.functions.items():
+                out = values[label][start:start + chunk_size]
+                for mask, function in terms:
+                    if mask is None:
+                        out += function(*chunk)
+                        continue
+                    # points failing the guard may raise 0 to negative powers
+                    with numpy.errstate(divide='ignore', invalid='ignore'):
+                        value = numpy.broadcast_to(function(*chunk), out.shape)
+                    where = numpy.broadcast_to(mask(*chunk), out.shape)
+                    out[where] += value[where]
+        return {label: value.reshape(shape) for label, value in values.items()}
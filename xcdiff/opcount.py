@@ -0,0 +1,154 @@
+"""
+Operation counts and code size of every emitted derivative component
+
+    python -m xcdiff.opcount --only b88 --orders 2 3 --top 20
+    python -m xcdiff.opcount --format csv --output components.csv
+    python -m xcdiff.opcount --catalog catalog.json --only Slater
+
+The functionals are those of xcdiff.benchmark, or of a catalog file as
+read by python -m xcdiff.  A component is listed once, at the lowest
+order at which it is generated
+"""
+import argparse
+import csv
+import functools
+import io
+import json
+import re
+import sys
+import time
+
+from . import catalog
+from .base import DERIVATIVE_FUNCTIONS
+from .benchmark import FUNCTIONALS
+
+CALLS = ('pow', 'exp', 'log')
+
+FIELDS = ('functional', 'order', 'label', 'ops', *CALLS, 'chars', 'time')
+
+
+def components(functional, orders=tuple(DERIVATIVE_FUNCTIONS)) -> list:
+    """
+    Rows of operation count, number of pow/exp/log calls, characters of C
+    code and generation time of each component, at the first of orders
+    that has it. Derivatives are memoized, so the time of a component is
+    what it adds to those before it
+    """
+    rows = []
+    seen = set()
+    for order in sorted(orders):
+        for _, groups in functional.layout(order):
+            for group in groups:
+                for component in group:
+                    if component.label in seen:
+                        continue
+                    seen.add(component.label)
+                    start = time.perf_counter()
+                    code = component.code
+                    elapsed = time.perf_counter() - start
+                    calls = re.findall(r'\b(%s)\(' % '|'.join(CALLS), code)
+                    rows.append({
+                        'functional': functional.name,
+                        'order': order,
+                        'label': component.label,
+                        'ops': int(component.expr.count_ops()),
+                        **{call: calls.count(call) for call in CALLS},
+                        'chars': len(code),
+                        'time': elapsed,
+                    })
+    return rows
+
+
+def run(names=None, orders=tuple(DERIVATIVE_FUNCTIONS), path=None, **kwargs) -> list:
+    """
+    Rows of all components of the named benchmark functionals, or of the
+    functionals of the catalog file path, most expensive first
+    """
+    rows = []
+    for make in makers(names, path):
+        rows += components(make(**kwargs), orders)
+    return sorted(rows, key=lambda row: (-row['ops'], -row['chars']))
+
+
+def makers(names=None, path=None) -> list:
+    """
+    Constructors of the named benchmark functionals, or of the catalog
+    functionals if path is given, of all if names is None; a ValueError
+    names any unknown functional
+    """
+    if path is None:
+        available = dict(FUNCTIONALS)
+    else:
+        available = {
+            entry['name'].lower(): functools.partial(build, entry)
+            for entry in catalog.load(path)
+        }
+    names = list(available) if names is None else [name.lower() for name in names]
+    unknown = [name for name in names if name not in available]
+    if unknown:
+        raise ValueError(f'unknown functionals: {", ".join(unknown)}')
+    return [available[name] for name in names]
+
+
+def build(entry: dict, **kwargs):
+    """
+    Functional of a catalog entry, with kwargs added to its options
+    """
+    return catalog.build({**entry, 'options': {**entry.get('options', {}), **kwargs}})
+
+
+def report(rows: list) -> str:
+    lines = [
+        f"{'functional':12} {'order':>5} {'label':8} {'ops':>8} "
+        + ' '.join(f'{call:>5}' for call in CALLS) + f" {'chars':>8} {'time/s':>9}"
+    ]
+    for row in rows:
+        lines.append(
+            f"{row['functional']:12} {row['order']:5} {row['label']:8} {row['ops']:8} "
+            + ' '.join(f'{row[call]:5}' for call in CALLS)
+            + f" {row['chars']:8} {row['time']:9.4f}"
+        )
+    return '\n'.join(lines)
+
+
+def to_csv(rows: list) -> str:
+    output = io.StringIO()
+    writer = csv.DictWriter(output, FIELDS, lineterminator='\n')
+    writer.writeheader()
+    writer.writerows(rows)
+    return output.getvalue()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m xcdiff.opcount', description=__doc__.strip())
+    parser.add_argument('--catalog', help='JSON catalog of functionals, as for python -m xcdiff')
+    parser.add_argument('--only', nargs='+', help='names of the functionals to count')
+    parser.add_argument(
+        '--orders', nargs='+', type=int, choices=DERIVATIVE_FUNCTIONS, default=DERIVATIVE_FUNCTIONS
+    )
+    parser.add_argument('--top', type=int, help='only the n most expensive components')
+    parser.add_argument('--format', choices=('text', 'csv', 'json'), default='text')
+    parser.add_argument('--output', help='write to file instead of stdout')
+    args = parser.parse_args(argv)
+
+    try:
+        makers(args.only, args.catalog)
+    except (OSError, ValueError) as error:
+        parser.error(str(error))
+    rows = run(args.only, args.orders, args.catalog)[:args.top]
+    if args.format == 'csv':
+        text = to_csv(rows)
+    elif args.format == 'json':
+        text = json.dumps(rows, indent=2) + '\n'
+    else:
+        text = report(rows) + '\n'
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text)
+    else:
+        sys.stdout.write(text)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
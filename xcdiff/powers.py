@@ -0,0 +1,104 @@
+"""
+Fractional powers: exact exponents for inexact input, and hoisting of
+all powers b**(p/q) of one base in a block, which are derived by
+multiplication from a single root b**(1/q) computed with sqrt or cbrt
+instead of one pow call each
+"""
+from fractions import Fraction
+
+from sympy import Pow, Rational, Symbol
+
+from .printer import ccode
+
+ROOTS = {2: 'sqrt({})', 3: 'cbrt({})', 6: 'cbrt(sqrt({}))'}
+
+
+def fraction(exponent, tolerance: float = 1e-9):
+    """
+    Exponent as a fraction p/q with q in 2, 3, 6, also when given as a
+    Float such as 0.33333333333333326, else None
+    """
+    if not exponent.is_number or exponent.is_Integer:
+        return None
+    value = float(exponent)
+    for q in ROOTS:
+        p = round(value * q)
+        if abs(value * q - p) < tolerance and p % q:
+            return Fraction(p, q)
+    return None
+
+
+def rationalize(expr: Symbol, tolerance: float = 1e-10, max_denominator: int = 100) -> tuple:
+    """
+    Expression with Float exponents within tolerance of a fraction of at
+    most max_denominator replaced by Rationals, and the conversions made
+    """
+    conversions = {}
+    for power in expr.atoms(Pow):
+        if power.exp.is_Float:
+            exact = Fraction(float(power.exp)).limit_denominator(max_denominator)
+            if abs(float(power.exp) - exact) <= tolerance * max(1, abs(exact)):
+                conversions[power.exp] = Rational(exact.numerator, exact.denominator)
+    if not conversions:
+        return expr, conversions
+    expr = expr.replace(
+        lambda e: e.is_Pow and e.exp in conversions,
+        lambda e: Pow(e.base, conversions[e.exp])
+    )
+    return expr, conversions
+
+
+def hoist(exprs: list, roots) -> tuple:
+    """
+    Definitions as (symbol, C code) pairs, in order of dependence, and the
+    expressions with every fractional power of a non-constant base
+    replaced by a symbol; roots supplies the names of the roots
+    """
+    powers = {}
+    for expr in exprs:
+        for power in expr.atoms(Pow):
+            exponent = fraction(power.exp)
+            if exponent is not None and power.base.free_symbols:
+                powers[power] = exponent
+
+    bases = {}
+    for power, exponent in powers.items():
+        bases.setdefault(power.base, []).append((power, exponent))
+
+    definitions = []
+    replacements = {}
+    # inner powers first, so that the bases of outer ones may use them
+    for base in sorted(bases, key=lambda base: base.count_ops()):
+        terms = bases[base]
+        q = max(exponent.denominator for _, exponent in terms)
+        if any(q % exponent.denominator for _, exponent in terms):
+            q = 6
+        root = next(roots)
+        definitions.append((root, ROOTS[q].format(ccode(base.xreplace(replacements)))))
+        chain = {1: root}
+        for power, exponent in terms:
+            n = int(exponent * q)
+            replacements[power] = multiply(abs(n), root, chain, definitions, n < 0)
+    return definitions, [expr.xreplace(replacements) for expr in exprs]
+
+
+def multiply(n: int, root: Symbol, chain: dict, definitions: list, inverse=False) -> Symbol:
+    """
+    Symbol of root**n, or of its inverse, defined by squaring and
+    multiplication of lower powers in chain
+    """
+    if n not in chain:
+        half = multiply(n // 2, root, chain, definitions)
+        square = Symbol(f'{root}_{2 * (n // 2)}')
+        if 2 * (n // 2) not in chain:
+            definitions.append((square, f'{half}*{half}'))
+            chain[2 * (n // 2)] = square
+        if n % 2:
+            chain[n] = Symbol(f'{root}_{n}')
+            definitions.append((chain[n], f'{square}*{root}'))
+    if not inverse:
+        return chain[n]
+    if -n not in chain:
+        chain[-n] = Symbol(f'{root}_m{n}')
+        definitions.append((chain[-n], f'1.0/{chain[n]}'))
+    return chain[-n]
@@ -0,0 +1,31 @@
+"""
+C code printing of SymPy expressions
+
+Exact arithmetic on derivatives of Rational coefficients produces
+integers such as 20940000000000000000 that do not fit in a 64-bit C
+integer; as literals they overflow silently.  They are printed as double
+literals instead
+"""
+from sympy import Symbol
+from sympy.printing.c import C99CodePrinter
+
+INTEGER_MAX = 2**63 - 1
+
+
+class CCodePrinter(C99CodePrinter):
+    """
+    C99 printer of sympy.ccode with double literals for integers beyond
+    64 bits
+    """
+
+    def _print_Integer(self, expr):
+        if abs(expr.p) > INTEGER_MAX:
+            return f'{expr.p}.0'
+        return super()._print_Integer(expr)
+
+
+def ccode(expr: Symbol, assign_to=None, **settings) -> str:
+    """
+    C code of an expression, as sympy.ccode
+    """
+    return CCodePrinter(settings).doprint(expr, assign_to)
@@ -0,0 +1,58 @@
+"""
+Cost model for the choice between emission strategies
+
+The cost of an expression is its number of floating point operations,
+with calls to the math library weighted by their typical latency in
+multiplications
+"""
+import sympy
+
+STRATEGIES = {
+    'expanded': {},
+    'cse': {'cse': True},
+    'taylor': {'taylor': True},
+}
+
+DIVISION = 4
+SQRT = 5
+LIBM = 20
+
+
+def flops(expr) -> int:
+    """
+    Weighted operation count of an expression as printed by ccode
+    """
+    if expr.is_Atom:
+        return 0
+    args = sum(flops(arg) for arg in expr.args)
+    if expr.is_Add or expr.is_Mul:
+        return args + len(expr.args) - 1
+    if expr.is_Pow:
+        exponent = expr.exp
+        if exponent.is_Integer:
+            operations = abs(int(exponent)) - 1
+            if exponent < 0:
+                operations += DIVISION
+            return args + max(operations, 0)
+        if exponent == sympy.Rational(1, 2):
+            return args + SQRT
+        return args + LIBM
+    return args + LIBM
+
+
+def report(estimates: dict, choices: dict) -> str:
+    """
+    Lines of the choice and estimates of each order for the info block,
+    with the reason a strategy could not be used
+    """
+    lines = []
+    for order, strategy in choices.items():
+        costs = ', '.join(
+            f"{name} unavailable ({estimate['error']})" if 'error' in estimate else
+            f"{name} {estimate['cost']:.0f}" + (
+                f"/{estimate['time']:.1f} ns" if 'time' in estimate else ''
+            ) + f" ({estimate['lines']} lines)"
+            for name, estimate in estimates[order].items()
+        )
+        lines.append(f'    order {order}: {strategy} [{costs}]\n')
+    return ''.join(lines)
@@ -0,0 +1,279 @@
+"""
+Truncated multivariate Taylor arithmetic in C: F is evaluated once per
+point on Taylor numbers, arrays of the coefficients d^a F/a! for all
+multi-indices |a| <= order, so that the size of the code grows with the
+size of F rather than with that of its symbolic derivatives
+"""
+import itertools
+import math
+
+import sympy
+from sympy import Symbol
+
+from .derivatives import lattice
+from .printer import ccode
+from .strategy import flops
+
+RUNTIME = """
+/* Truncated Taylor arithmetic: a Taylor number holds d^a F/a! for all
+ * multi-indices |a| <= order, pairs lists (i, j, k) with a_i + a_j = a_k */
+typedef struct {{
+    integer n, order, npairs;
+    const short (*pairs)[3];
+}} TaylorSpace;
+
+#define TAYLOR_MAX {size}
+{spaces}
+static void
+taylor_variable(const TaylorSpace* s, real* c, real value, integer i)
+{{
+    integer k;
+    for (k = 0; k < s->n; k++) c[k] = 0;
+    c[0] = value;
+    c[i] = 1;
+}}
+
+static void
+taylor_linear(const TaylorSpace* s, real* c, real alpha, const real* a, real beta, const real* b)
+{{
+    integer k;
+    for (k = 0; k < s->n; k++) c[k] = alpha*a[k] + beta*b[k];
+}}
+
+static void
+taylor_affine(const TaylorSpace* s, real* c, real alpha, const real* a, real beta)
+{{
+    integer k;
+    for (k = 0; k < s->n; k++) c[k] = alpha*a[k];
+    c[0] += beta;
+}}
+
+static void
+taylor_mul(const TaylorSpace* s, real* c, const real* a, const real* b)
+{{
+    real t[TAYLOR_MAX];
+    integer k;
+    for (k = 0; k < s->n; k++) t[k] = 0;
+    for (k = 0; k < s->npairs; k++)
+        t[s->pairs[k][2]] += a[s->pairs[k][0]]*b[s->pairs[k][1]];
+    for (k = 0; k < s->n; k++) c[k] = t[k];
+}}
+
+/* c = f(a) given d[k] = f^(k)(a[0])/k!, by Horner in h = a - a[0] up to
+ * the first non-finite d[m]; the terms d[k]*h^k from m on are added only
+ * to the coefficients h^k has, so that an infinite derivative, e.g. of
+ * pow(x, 1.7) at x = 0, does not turn the others into inf*0 = NaN */
+static void
+taylor_compose(const TaylorSpace* s, real* c, const real* a, const real* d)
+{{
+    real h[TAYLOR_MAX], p[TAYLOR_MAX];
+    integer k, j, m;
+    for (m = 0; m <= s->order && isfinite(d[m]); m++);
+    for (k = 0; k < s->n; k++) {{
+        h[k] = a[k];
+        c[k] = 0;
+    }}
+    h[0] = 0;
+    if (m > 0) {{
+        c[0] = d[m - 1];
+        for (k = m - 2; k >= 0; k--) {{
+            taylor_mul(s, c, c, h);
+            c[0] += d[k];
+        }}
+    }}
+    if (m > s->order) return;
+    for (k = 0; k < s->n; k++) p[k] = 0;
+    p[0] = 1;
+    for (k = 0; k < m; k++) taylor_mul(s, p, p, h);
+    for (k = m; k <= s->order; k++) {{
+        for (j = 0; j < s->n; j++)
+            if (p[j] != 0) c[j] += d[k]*p[j];
+        taylor_mul(s, p, p, h);
+    }}
+}}
+"""
+
+
+def indices(nvariables: int, order: int) -> list:
+    """
+    Multi-indices of a Taylor number, by increasing total order
+    """
+    return [
+        tuple(key.count(i) for i in range(nvariables))
+        for n in range(order + 1)
+        for key in lattice(range(nvariables), n)
+    ]
+
+
+def pairs(nvariables: int, order: int) -> list:
+    index = indices(nvariables, order)
+    position = {a: k for k, a in enumerate(index)}
+    return [
+        (i, j, position[c])
+        for (i, a), (j, b) in itertools.product(enumerate(index), repeat=2)
+        for c in [tuple(x + y for x, y in zip(a, b))]
+        if c in position
+    ]
+
+
+def space(nvariables: int, order: int) -> str:
+    return f'taylor_{nvariables}_{order}'
+
+
+def runtime(spaces) -> str:
+    """
+    C definitions of the Taylor arithmetic for given (nvariables, order)
+    """
+    spaces = sorted(set(spaces))
+    definitions = []
+    for nvariables, order in spaces:
+        table = pairs(nvariables, order)
+        name = space(nvariables, order)
+        rows = [
+            '    ' + ' '.join(f'{{{i},{j},{k}}},' for i, j, k in table[r:r + 8])
+            for r in range(0, len(table), 8)
+        ]
+        definitions += [
+            f'static const short {name}_pairs[{len(table)}][3] = {{',
+            *rows,
+            '};',
+            f'static const TaylorSpace {name} = '
+            f'{{{len(indices(nvariables, order))}, {order}, {len(table)}, {name}_pairs}};',
+            '',
+        ]
+    size = max(len(indices(n, order)) for n, order in spaces)
+    return RUNTIME.format(size=size, spaces='\n'.join(definitions))
+
+
+class Expansion:
+    """
+    C program computing the Taylor number of an expression in given
+    variables, truncated at order
+    """
+
+    def __init__(self, variables: tuple, order: int, names):
+        self.variables = tuple(variables)
+        self.order = order
+        self.names = names
+        self.indices = indices(len(variables), order)
+        self.space = '&' + space(len(variables), order)
+        self.lines = []
+        self.nodes = {}
+        self.cost = 0
+        # floating point operations per call, for the cost model of strategy
+        n, npairs = len(self.indices), len(pairs(len(variables), order))
+        self.costs = {
+            'taylor_variable': 0,
+            'taylor_linear': 3 * n,
+            'taylor_affine': 2 * n + 1,
+            'taylor_mul': 2 * npairs,
+            'taylor_compose': order * (2 * npairs + 1),
+        }
+
+    def program(self, expr: Symbol) -> list:
+        self.result = self.node(expr)
+        self.cost += sum(
+            self.costs[line.split('(')[0]] for line in self.lines if line.startswith('taylor_')
+        )
+        return self.lines
+
+    def derivative(self, variables: tuple) -> str:
+        """
+        C code of a derivative of the expression, from its coefficient
+        """
+        counts = tuple(variables.count(v) for v in self.variables)
+        scale = math.prod(math.factorial(c) for c in counts)
+        coefficient = f'{self.result}[{self.indices.index(counts)}]'
+        return f'{scale}*{coefficient}' if scale > 1 else coefficient
+
+    def scalar(self, expr: Symbol) -> bool:
+        return not expr.free_symbols & set(self.variables)
+
+    def new(self) -> Symbol:
+        name = next(self.names)
+        self.lines.append(f'real {name}[{len(self.indices)}];')
+        return name
+
+    def node(self, expr: Symbol) -> Symbol:
+        if expr not in self.nodes:
+            self.nodes[expr] = self.evaluate(expr)
+        return self.nodes[expr]
+
+    def evaluate(self, expr: Symbol) -> Symbol:
+        if self.scalar(expr):
+            # a constant, e.g. the zero Fa of a functional of rhob only
+            x = next(self.names)
+            self.lines.append(f'real {x}[{len(self.indices)}] = {{{ccode(expr)}}};')
+            return x
+        if expr in self.variables:
+            x = self.new()
+            i = self.indices.index(tuple(int(v == expr) for v in self.variables))
+            self.lines.append(f'taylor_variable({self.space}, {x}, {ccode(expr)}, {i});')
+            return x
+        if expr.is_Add or expr.is_Mul:
+            constant, terms = expr.as_independent(*self.variables, as_Add=expr.is_Add)
+            terms = sympy.Add.make_args(terms) if expr.is_Add else sympy.Mul.make_args(terms)
+            first, *rest = [self.node(term) for term in terms]
+            if not rest and constant == (0 if expr.is_Add else 1):
+                return first
+            x = self.new()
+            if expr.is_Add:
+                if rest:
+                    y, *rest = rest
+                    self.lines.append(f'taylor_linear({self.space}, {x}, 1, {first}, 1, {y});')
+                    first = x
+                for y in rest:
+                    self.lines.append(f'taylor_linear({self.space}, {x}, 1, {x}, 1, {y});')
+                if constant != 0 or first is not x:
+                    self.lines.append(
+                        f'taylor_affine({self.space}, {x}, 1, {first}, {ccode(constant)});'
+                    )
+            else:
+                if rest:
+                    y, *rest = rest
+                    self.lines.append(f'taylor_mul({self.space}, {x}, {first}, {y});')
+                    first = x
+                for y in rest:
+                    self.lines.append(f'taylor_mul({self.space}, {x}, {x}, {y});')
+                if constant != 1 or first is not x:
+                    self.lines.append(
+                        f'taylor_affine({self.space}, {x}, {ccode(constant)}, {first}, 0);'
+                    )
+            return x
+        if expr.is_Pow:
+            base, exponent = expr.args
+            if not self.scalar(exponent) or self.scalar(base):
+                return self.node(sympy.exp(exponent * sympy.log(base)))
+            if exponent.is_Integer and 2 <= exponent <= 4:
+                b = self.node(base)
+                x = self.new()
+                self.lines.append(f'taylor_mul({self.space}, {x}, {b}, {b});')
+                for _ in range(int(exponent) - 2):
+                    self.lines.append(f'taylor_mul({self.space}, {x}, {x}, {b});')
+                return x
+            return self.compose(lambda u: u**exponent, base)
+        if isinstance(expr, sympy.Function) and len(expr.args) == 1:
+            return self.compose(expr.func, expr.args[0])
+        raise NotImplementedError(f'no Taylor arithmetic for {expr.func.__name__}')
+
+    def compose(self, function, argument: Symbol) -> Symbol:
+        """
+        Taylor number of function(argument) from the derivatives of the
+        univariate function at the value of the argument
+        """
+        a = self.node(argument)
+        u = Symbol('u')
+        value = Symbol(f'{a}[0]')
+        f = function(u)
+        derivatives = [
+            (f.diff(u, k) / math.factorial(k)).xreplace({u: value})
+            for k in range(self.order + 1)
+        ]
+        self.cost += sum(flops(d) for d in derivatives)
+        derivatives = [ccode(d) for d in derivatives]
+        x = self.new()
+        self.lines += [
+            f'const real {x}_d[] = {{{", ".join(derivatives)}}};',
+            f'taylor_compose({self.space}, {x}, {a}, {x}_d);',
+        ]
+        return x
@@ -0,0 +1,108 @@
+"""
+Optional instrumentation of the generator: wall time and net allocation
+of each phase and df component, saved as a Chrome trace that can be
+opened in chrome://tracing, Perfetto or speedscope
+
+    with trace.tracing('xcdiff-trace.json'):
+        str(functional)
+
+or for a whole run
+
+    XCDIFF_TRACE=xcdiff-trace.json python make_functional.py
+
+Allocation tracing with tracemalloc slows SymPy down severalfold; it is
+off with memory=False or XCDIFF_TRACE_MEMORY=0
+"""
+import atexit
+import contextlib
+import json
+import os
+import threading
+import time
+import tracemalloc
+
+_recorder = None
+
+
+class Recorder:
+    """
+    Complete ('X') events of the Chrome trace event format, with times
+    in microseconds; with memory the net traced allocation of each span
+    is added to its args
+    """
+
+    def __init__(self, memory: bool = True):
+        self.memory = memory
+        self.events = []
+        self.origin = time.perf_counter()
+
+    def record(self, name: str, start: float, end: float, category: str, args: dict):
+        self.events.append({
+            'name': name,
+            'cat': category,
+            'ph': 'X',
+            'ts': (start - self.origin) * 1e6,
+            'dur': (end - start) * 1e6,
+            'pid': os.getpid(),
+            'tid': threading.get_ident(),
+            'args': args,
+        })
+
+    def dump(self, path):
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': self.events, 'displayTimeUnit': 'ms'}, f)
+
+
+@contextlib.contextmanager
+def span(name: str, category: str = 'phase', **args):
+    """
+    Record the enclosed block if tracing is on, else do nothing
+    """
+    recorder = _recorder
+    if recorder is None:
+        yield
+        return
+    allocated = tracemalloc.get_traced_memory()[0] if recorder.memory else 0
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        end = time.perf_counter()
+        if recorder.memory:
+            args['allocated'] = tracemalloc.get_traced_memory()[0] - allocated
+        recorder.record(name, start, end, category, args)
+
+
+@contextlib.contextmanager
+def tracing(path=None, memory: bool = True):
+    """
+    Turn tracing on in the enclosed block, saving the trace to path if
+    given; yields the Recorder
+    """
+    global _recorder
+    previous = _recorder
+    started = memory and not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    _recorder = Recorder(memory)
+    try:
+        yield _recorder
+    finally:
+        recorder, _recorder = _recorder, previous
+        if started:
+            tracemalloc.stop()
+        if path is not None:
+            recorder.dump(path)
+
+
+def start(path, memory: bool = True):
+    """
+    Trace until exit of the interpreter, as set by XCDIFF_TRACE
+    """
+    context = tracing(path, memory)
+    context.__enter__()
+    atexit.register(context.__exit__, None, None, None)
+
+
+if os.environ.get('XCDIFF_TRACE'):
+    start(os.environ['XCDIFF_TRACE'], memory=os.environ.get('XCDIFF_TRACE_MEMORY', '1') != '0')
@@ -0,0 +1,94 @@
+"""
+Verification of generated derivatives by central finite differences
+
+    >>> errors = verify(functional, order=4, points=10**5)
+    >>> print(report(errors))
+
+Each component is compared with the finite difference of a component of
+one order lower, both evaluated by the NumPy backend on random grid points
+"""
+import numpy
+
+from .base import array
+from .numeric import NumpyBackend
+
+EPSILON = numpy.sqrt(numpy.finfo(float).eps)
+
+
+def sample(functional, points: int, seed=None) -> dict:
+    """
+    Random grid points with densities above the threshold of the functional
+    and gradient norms consistent with |grad rhoa . grad rhob| <= grada gradb
+    """
+    rng = numpy.random.default_rng(seed)
+    low = max(1e-3, 10 * (functional.threshold or 0))
+    grid = {}
+    for variable in functional.variables:
+        grid[array(variable)] = numpy.exp(rng.uniform(numpy.log(low), numpy.log(10.0), points))
+    if 'gradab' in grid:
+        grid['gradab'] = grid['grada'] * grid['gradb'] * rng.uniform(-1, 1, points)
+    return grid
+
+
+def differences(functional, order: int) -> dict:
+    """
+    Label of every component up to order, mapped to the label of a lower
+    order component and the variable it is differentiated with to yield it
+    """
+    labels = {}
+    for _, groups in functional.layout(order):
+        for group in groups:
+            for component in group:
+                labels[component.label] = component.variables
+    pairs = {}
+    for label, variables in labels.items():
+        for i, variable in enumerate(variables):
+            lower = variables[:i] + variables[i + 1:]
+            lower_label = functional.label(lower) if lower else 'energy'
+            if lower_label == 'energy' or lower_label in labels:
+                pairs[label] = (lower_label, variable)
+                break
+    return pairs
+
+
+def verify(
+        functional, order: int = 4, points: int = 10**4, step: float = 1e-5,
+        atol: float = 1e-6, seed=None, chunk_size: int = 2**14, constants: dict = None
+        ) -> dict:
+    """
+    Maximum relative error of each df component against the central
+    difference of its lower order component, with a relative step for each
+    variable; errors are relative to max(|derivative|, atol), or to the
+    magnitude the difference quotient can resolve if that is larger
+    """
+    exact = NumpyBackend(functional, order, constants)
+    lower = NumpyBackend(functional, max(order - 1, 1), constants)
+    pairs = differences(functional, order)
+    grid = sample(functional, points, seed)
+    errors = dict.fromkeys(pairs, 0.0)
+    for start in range(0, points, chunk_size):
+        chunk = {name: values[start:start + chunk_size] for name, values in grid.items()}
+        values = exact(chunk_size, **chunk)
+        for variable in functional.variables:
+            name = array(variable)
+            h = step * numpy.maximum(numpy.abs(chunk[name]), 1e-3)
+            plus = lower(chunk_size, **{**chunk, name: chunk[name] + h})
+            minus = lower(chunk_size, **{**chunk, name: chunk[name] - h})
+            for label, (lower_label, v) in pairs.items():
+                if v != variable:
+                    continue
+                fd = (plus[lower_label] - minus[lower_label]) / (2 * h)
+                scale = numpy.maximum(numpy.abs(values[label]), atol)
+                # derivatives below the rounding error of the difference itself
+                noise = EPSILON * (numpy.abs(plus[lower_label]) + numpy.abs(minus[lower_label])) / h
+                error = numpy.abs(fd - values[label]) / numpy.maximum(scale, noise)
+                errors[label] = max(errors[label], float(error.max(initial=0.0)))
+    return errors
+
+
+def report(errors: dict, tolerance: float = 1e-4) -> str:
+    lines = [f"{'component':10} {'max rel err':>12}"]
+    for label, error in errors.items():
+        flag = '  FAIL' if not error <= tolerance else ''
+        lines.append(f"{label:10} {error:12.3e}{flag}")
+    return '\n'.join(lines)